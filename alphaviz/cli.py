@@ -26,6 +26,15 @@ def run(ctx, **kwargs):
 
 
 @run.command("gui", help="Start graphical user interface.")
-def gui():
+@click.option(
+    "--no-version-check",
+    is_flag=True,
+    help="Do not check GitHub for a new AlphaViz version (e.g. on offline machines).",
+)
+def gui(no_version_check):
+    if no_version_check:
+        import os
+        import alphaviz.utils
+        os.environ[alphaviz.utils.NO_VERSION_CHECK_VARIABLE] = "1"
     import alphaviz.gui
     alphaviz.gui.run()
@@ -2,19 +2,16 @@ import os
 import logging
 import platform
 import json
+import threading
 import warnings
+from functools import partial
 import pandas as pd
 from pandas.core.common import SettingWithCopyWarning
 from io import StringIO
 
-import alphatims.bruker
-import alphatims.utils
-
 # visualization
 import panel as pn
-import bokeh.server.views.ws
 import plotly.express as px
-import holoviews as hv
 
 # local
 import alphaviz
@@ -25,6 +22,18 @@ import alphaviz.plotting
 
 warnings.simplefilter(action="ignore", category=SettingWithCopyWarning)
 
+# the columns offered in the QC distribution plots by the table they are taken from
+QC_DISTRIBUTION_COLUMNS = {
+    'maxquant': {
+        'mq_evidence': ['m/z', 'Charge', 'Length', 'Mass', '1/K0', 'CCS', 'K0 length', 'Missed cleavages', 'Andromeda score', 'Intensity', 'Mass error [ppm]', 'Mass error [Da]', 'Uncalibrated mass error [ppm]', 'Uncalibrated mass error [Da]'],
+        'mq_protein_groups': ['Score', '(EXP) # peptides'],
+    },
+    'diann': {
+        'diann_peptides': ['m/z', 'Charge', 'Length', 'IM', 'CScore', 'Decoy.CScore', 'Decoy.Evidence', 'Evidence', 'Global.Q.Value', 'Q.Value', 'Quantity.Quality', 'Spectrum.Similarity'],
+        'diann_proteins': ['(EXP) # peptides', 'Global.PG.Q.Value', 'PG.Q.Value', 'PG.Quantity', 'Protein.Q.Value'],
+    },
+}
+
 
 def get_css_style(
     file_name="dashboard_style.css",
@@ -39,6 +48,7 @@ def get_css_style(
 
 
 def init_panel():
+    import holoviews as hv
     pn.extension(raw_css=[get_css_style()])
     hv.extension('bokeh')
     pn.extension('plotly')
@@ -228,27 +238,21 @@ class MainWidget(object):
         )
 
     def create_layout(self):
-
-        latest_github_version = alphaviz.utils.check_github_version(
+        self.download_new_version_button.visible = False
+        self.download_new_version_button.js_on_click(
+            code="""window.open("https://github.com/MannLabs/alphaviz/releases/latest")"""
+        )
+        alphaviz.utils.check_github_version_async(
+            partial(self.schedule_new_version_button_update, pn.state.curdoc),
             silent=False
         )
 
-        if latest_github_version and \
-                latest_github_version != alphaviz.__version__:
-            self.download_new_version_button.name = f"Download version {latest_github_version}"
-            download_new_version_button = self.download_new_version_button
-            download_new_version_button.js_on_click(
-                code="""window.open("https://github.com/MannLabs/alphaviz/releases/latest")"""
-            )
-        else:
-            download_new_version_button = None
-
         self.layout = pn.Row(
             self.project_description,
             pn.layout.HSpacer(width=500),
             pn.Column(
                 self.manual,
-                download_new_version_button,
+                self.download_new_version_button,
                 align='center',
             ),
             background='#eaeaea',
@@ -260,6 +264,21 @@ class MainWidget(object):
         )
         return self.layout
 
+    def schedule_new_version_button_update(self, doc, latest_github_version):
+        # called from the version check thread, the button is only changed on the thread of the document
+        if doc is not None:
+            doc.add_next_tick_callback(
+                partial(self.update_new_version_button, latest_github_version)
+            )
+        else:
+            self.update_new_version_button(latest_github_version)
+
+    def update_new_version_button(self, latest_github_version):
+        if latest_github_version and \
+                latest_github_version != alphaviz.__version__:
+            self.download_new_version_button.name = f"Download version {latest_github_version}"
+            self.download_new_version_button.visible = True
+
 
 class DataImportWidget(BaseWidget):
 
@@ -277,7 +296,17 @@ class DataImportWidget(BaseWidget):
         self.predlib = None
         self.model_mgr = None
         self.psm_df = pd.DataFrame()
+        self.psm_index = dict()
+        self.frame_topology = dict()
+        # the extracted precursor/fragment XICs shared by the elution profile views of the current raw file
+        self.xic_cache = alphaviz.utils.LRUCache(max_size=256, max_nbytes=256 * 2**20)
+        self.heatmap_cache = alphaviz.utils.LRUCache(max_size=64, max_nbytes=256 * 2**20)
+        self.chromatograms = None
+        self.qc_statistics = dict()
         self.fasta = None
+        self.peptide_mapping = pd.DataFrame()
+        self.protein_coverage_bitmaps = dict()
+        self.protein_coverage_event = pn.widgets.IntInput(value=0)
         self.layout = None
         self.settings = {
             'path_evidence_file': str(),
@@ -339,6 +368,14 @@ class DataImportWidget(BaseWidget):
             sizing_mode='stretch_width',
             margin=(10, 0, 5, 0),
         )
+        # the chromatograms from the sidecar file shown while the raw file is loaded
+        self.chromatograms_preview = pn.pane.Plotly(
+            None,
+            config=update_config('Chromatograms'),
+            visible=False,
+            sizing_mode='stretch_width',
+            margin=(0, 10, 10, 10),
+        )
         self.mass_dict = alphaviz.utils.get_mass_dict(
             modfile=os.path.join(
                 alphaviz.utils.DATA_PATH,
@@ -350,6 +387,8 @@ class DataImportWidget(BaseWidget):
             ),
             verbose=False,
         )
+        self.residue_codes, self.mass_table = alphaviz.utils.get_mass_table(self.mass_dict)
+        alphaviz.utils.warm_up_numba(self.mass_dict)
 
     def create_layout(self):
         dependances = {
@@ -381,6 +420,7 @@ class DataImportWidget(BaseWidget):
                     margin=(100, 40, 0, 0),
                 )
             ),
+            self.chromatograms_preview,
             title='Data Import',
             collapsed=False,
             collapsible=True,
@@ -424,22 +464,44 @@ class DataImportWidget(BaseWidget):
             self.import_error.object = "#### The selected folder does not contain any .d or .hdf files."
 
     def load_data(self, *args):
+        import alphatims.bruker
+        import alphatims.utils
         alphatims.utils.set_progress_callback(self.upload_progress)
         self.settings['analysis_software'] = ''
         self.model_mgr = None
         self.psm_df = pd.DataFrame()
+        self.psm_index = dict()
+        self.xic_cache.clear()
+        self.heatmap_cache.clear()
         self.import_error.object = ''
         self.upload_progress.value = 0
-        try:
-            self.raw_data = alphatims.bruker.TimsTOF(
-                os.path.join(
-                    self.path_raw_folder.value,
-                    self.ms_file_name.value
-                ),
+        raw_path = os.path.join(
+            self.path_raw_folder.value,
+            self.ms_file_name.value
+        )
+        # the chromatograms of a raw file loaded before are read from the sidecar file without the raw data
+        self.chromatograms = alphaviz.io.import_chromatograms(raw_path)
+        if self.chromatograms is not None:
+            self.chromatograms_preview.object = alphaviz.plotting.plot_chrom(
+                self.chromatograms,
+                'Plotly'
             )
+        self.chromatograms_preview.visible = self.chromatograms is not None
+        try:
+            self.raw_data = alphatims.bruker.TimsTOF(raw_path)
         except:
             self.import_error.object += '\n#### The selected unprocessed Bruker file is corrupted and cannot be loaded. \n#### Please select another file.',
             raise OSError('The selected unprocessed Bruker file is corrupted and cannot be loaded. Please select another file.')
+        if self.chromatograms is None:
+            self.chromatograms = alphaviz.io.import_chromatograms(
+                raw_path,
+                self.raw_data
+            )
+        # quick fix the AlphaTims's bug with the differences in the Frames in raw_data.fragment_frames table for .d and .hdf files
+        self.frame_topology = alphaviz.preprocessing.get_frame_topology(
+            self.raw_data,
+            frame_shift=1 if self.ms_file_name.value.split('.')[-1] == 'hdf' else 0
+        )
         alphatims.utils.set_progress_callback(True)
         # TODO: to change it just by changing the active=True parameter for the self.upload_progress when the bug will be fixed
         self.upload_progress = pn.indicators.Progress(
@@ -489,14 +551,17 @@ class DataImportWidget(BaseWidget):
                         self.ms_file_name.value.split('.')[0],
                         self.fasta
                     )
-                    self.diann_peptides['m/z'] = self.diann_peptides.apply(
-                        lambda x: alphaviz.utils.calculate_mz(
-                            prec_mass=alphaviz.utils.get_precmass(
-                                alphaviz.utils.parse(x['Sequence_AP_mod']), self.mass_dict),
-                            charge=x['Charge']
-                        ),
-                        axis=1
+                    codes, peptide_offsets = alphaviz.utils.tokenize(
+                        self.diann_peptides['Sequence_AP_mod'].tolist(),
+                        self.residue_codes
+                    )
+                    prec_masses = alphaviz.utils.get_precmass_batch(
+                        codes,
+                        peptide_offsets,
+                        self.mass_table,
+                        self.mass_dict["H2O"]
                     )
+                    self.diann_peptides['m/z'] = prec_masses / self.diann_peptides['Charge'].abs().values + self.mass_dict["Proton"]
                     self.settings['analysis_software'] = 'diann'
                 except BaseException:
                     self.import_error.object += "\n#### The DIA-NN output files necessary for the visualization are not found."
@@ -542,13 +607,92 @@ class DataImportWidget(BaseWidget):
                 # trained on more Lumos files therefore should work better
                 # than 'timsTOF'
                 self.psm_df['spec_idx'] += 1
+                self.psm_index = self.psm_df.groupby(
+                    ['spec_idx', 'sequence']
+                ).indices
                 self.model_mgr.psm_num_to_tune_rt_ccs = 500
                 self.model_mgr.fine_tune_rt_model(self.psm_df)
                 # self.model_mgr.fine_tune_ccs_model(self.psm_df)
 
+        self.calculate_qc_statistics()
+        # the chromatograms are shown in the main view
+        self.chromatograms_preview.visible = False
+        self.chromatograms_preview.object = None
         self.trigger_dependancy()
         self.upload_progress.active = False
         self.upload_progress.value = 100
+        self.start_protein_coverage_stage()
+
+    def get_psm(self, spec_idx, sequence):
+        # the MBR/unsequenced evidence rows have no MS/MS scan number
+        if pd.isna(spec_idx):
+            return self.psm_df.iloc[0:0]
+        positions = self.psm_index.get((int(spec_idx), sequence), [])
+        return self.psm_df.iloc[positions]
+
+    def calculate_qc_statistics(self):
+        self.qc_statistics = dict()
+        for table_name, columns in QC_DISTRIBUTION_COLUMNS.get(self.settings['analysis_software'], dict()).items():
+            table = getattr(self, table_name)
+            self.qc_statistics.update(
+                alphaviz.preprocessing.get_qc_statistics(
+                    table,
+                    [column for column in columns if column in table.columns],
+                    count_columns=['(EXP) # peptides']
+                )
+            )
+
+    def start_protein_coverage_stage(self):
+        self.peptide_mapping = pd.DataFrame()
+        self.protein_coverage_bitmaps = dict()
+        if self.fasta is None:
+            return
+        if self.settings['analysis_software'] == 'maxquant':
+            proteins, peptides = self.mq_protein_groups, self.mq_evidence
+        elif self.settings['analysis_software'] == 'diann':
+            proteins, peptides = self.diann_proteins, self.diann_peptides
+        else:
+            return
+        threading.Thread(
+            target=self.calculate_protein_coverage,
+            args=(proteins, peptides, pn.state.curdoc),
+            daemon=True
+        ).start()
+
+    def calculate_protein_coverage(self, proteins, peptides, doc=None):
+        try:
+            protein_sequences = alphaviz.preprocessing.get_protein_sequences(
+                self.fasta
+            )
+            peptide_mapping = alphaviz.preprocessing.map_peptides_to_proteins(
+                peptides['Sequence'].unique(),
+                protein_sequences
+            )
+            coverage, bitmaps = alphaviz.preprocessing.get_protein_groups_coverage(
+                proteins['Protein IDs'],
+                peptide_mapping,
+                protein_sequences
+            )
+        except BaseException:
+            logging.info("The sequence coverage of the protein groups cannot be calculated.")
+            return
+        # the shown tables are only changed on the thread of the document
+        if doc is not None:
+            doc.add_next_tick_callback(
+                partial(self.apply_protein_coverage, proteins, peptide_mapping, coverage, bitmaps)
+            )
+        else:
+            self.apply_protein_coverage(proteins, peptide_mapping, coverage, bitmaps)
+
+    def apply_protein_coverage(self, proteins, peptide_mapping, coverage, bitmaps):
+        if proteins is not self.mq_protein_groups and proteins is not self.diann_proteins:
+            # another file has been loaded in the meantime
+            return
+        self.peptide_mapping = peptide_mapping
+        self.protein_coverage_bitmaps = bitmaps
+        for col in coverage.columns:
+            proteins[col] = coverage[col]
+        self.protein_coverage_event.value += 1
 
 
 class OptionsWidget(object):
@@ -573,6 +717,7 @@ class OptionsWidget(object):
 class HeatmapOptionsWidget(object):
 
     def __init__(self):
+        import holoviews as hv
         self.plot1_x_axis = pn.widgets.Select(
             name='X-axis label',
             value='m/z, Th',
@@ -814,6 +959,8 @@ class MainTab(object):
         self.protein_seq = str()
         self.gene_name = str()
         self.ms1_ms2_frames = dict()
+        self.ms1_frames = list()
+        self.current_frame_index = 0
         self.ms1_frame = None
         self.merged_precursor_data = pd.DataFrame()
         self.peptide = dict()
@@ -884,6 +1031,7 @@ class MainTab(object):
         )
         self.protein_coverage_plot = None
         self.chromatograms_plot = None
+        self.chromatograms_rt_range = None
         self.heatmap_ms1_plot = None
         self.heatmap_ms2_plot = None
         self.line_plot = None
@@ -963,10 +1111,10 @@ class MainTab(object):
                 self.peptides_table: [self.run_after_peptide_selection, 'selection'],
                 self.heatmap_x_axis: [self.display_heatmap_spectrum, 'value'],
                 self.heatmap_y_axis: [self.display_heatmap_spectrum, 'value'],
-                self.heatmap_colormap: [self.display_heatmap_spectrum, 'value'],
-                self.heatmap_background_color: [self.display_heatmap_spectrum, 'value'],
-                self.heatmap_precursor_size: [self.display_heatmap_spectrum, 'value'],
-                self.heatmap_precursor_color: [self.display_heatmap_spectrum, 'value'],
+                self.heatmap_colormap: [self.update_heatmaps_style, 'value'],
+                self.heatmap_background_color: [self.update_heatmaps_style, 'value'],
+                self.heatmap_precursor_size: [self.update_heatmaps_style, 'value'],
+                self.heatmap_precursor_color: [self.update_heatmaps_style, 'value'],
                 self.previous_frame: [self.display_previous_frame, 'clicks'],
                 self.next_frame: [self.display_next_frame, 'clicks'],
                 self.plot_overlapped_frames: [self.display_overlapped_frames, 'value'],
@@ -977,12 +1125,13 @@ class MainTab(object):
                 self.x_axis_label_diann: [self.display_elution_profile_plots, 'value'],
                 self.colorscale_qualitative: [self.update_plots_color, 'value'],
                 self.colorscale_sequential: [self.update_plots_color, 'value'],
-                self.image_save_size: [self.update_plots_color, 'value'],
-                self.image_save_format: [self.update_plots_color, 'value'],
+                self.image_save_size: [self.update_plots_config, 'value'],
+                self.image_save_format: [self.update_plots_config, 'value'],
                 self.show_mirrored_plot: [self.display_mass_spectrum, 'value'],
                 self.export_svg_ms1_button: [self.export_svg_ms1, 'clicks'],
                 self.export_svg_ms2_button: [self.export_svg_ms2, 'clicks'],
                 self.export_svg_elprofiles_button: [self.export_svg_elprofiles, 'clicks'],
+                self.data.protein_coverage_event: [self.update_protein_coverage, 'value'],
             }
             for k in dependances.keys():
                 k.param.watch(
@@ -1067,7 +1216,7 @@ class MainTab(object):
 
     def display_chromatogram(self, *args):
         chromatograms = alphaviz.plotting.plot_chrom(
-            self.data.raw_data,
+            self.data.chromatograms,
             self.colorscale_qualitative.value,
         )
         chrom_widget = pn.Pane(
@@ -1076,11 +1225,51 @@ class MainTab(object):
             sizing_mode='stretch_width',
             margin=(0, 10)
         )
+        # the chromatograms are downsampled, re-query them at a higher resolution when zooming
+        chrom_widget.param.watch(self.zoom_chromatogram, 'relayout_data')
+        self.chromatograms_plot = chrom_widget
+        self.chromatograms_rt_range = None
         if self.layout:
             self.layout[0] = chrom_widget
         else:
             return chrom_widget
 
+    def zoom_chromatogram(self, event):
+        relayout_data = event.new or {}
+        if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+            rt_range = (relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]'])
+        elif relayout_data.get('xaxis.autorange'):
+            rt_range = None
+        else:
+            return
+        if rt_range == self.chromatograms_rt_range:
+            # e.g. the relayout caused by the update itself
+            return
+        self.chromatograms_rt_range = rt_range
+        # only the points of the traces are replaced, the rest of the figure state is kept
+        alphaviz.plotting.update_chrom_range(
+            self.chromatograms_plot.object,
+            self.data.chromatograms,
+            rt_range=rt_range,
+        )
+        self.chromatograms_plot.param.trigger('object')
+
+    def update_protein_coverage(self, *args):
+        if self.analysis_software == 'maxquant':
+            proteins = self.data.mq_protein_groups
+        elif self.analysis_software == 'diann':
+            proteins = self.data.diann_proteins
+        else:
+            return
+        self.proteins_table.formatters = dict(
+            self.proteins_table.formatters,
+            **{'Seq coverage, %': {"type": "progress", "max": 100, "legend": True}}
+        )
+        # refresh only the unfiltered table not to lose the current selection
+        if not self.proteins_table.selection and not self.gene_name_filter.value \
+                and self.protein_list.value in [None, b'']:
+            self.proteins_table.value = proteins
+
     def update_gene_name_filter(self):
         self.proteins_table.selection = []
         self.peptides_table.selection = []
@@ -1210,7 +1399,8 @@ class MainTab(object):
                 self.colorscale_qualitative.value,
                 self.colorscale_sequential.value,
                 r"\[(.*?)\]|\((.*?)\)\)?",
-                self.curr_protein_ids
+                self.curr_protein_ids,
+                self.data.peptide_mapping
             )
             if not self.protein_coverage_plot and self.analysis_software == 'maxquant':
                 curr_protein_ids = sorted(self.peptides_table.value['Proteins'].values[0].split(';'), reverse=True)
@@ -1228,7 +1418,8 @@ class MainTab(object):
                         self.colorscale_qualitative.value,
                         self.colorscale_sequential.value,
                         r"\[(.*?)\]|\((.*?)\)\)?",
-                        prot_id
+                        prot_id,
+                        self.data.peptide_mapping
                     )
                     if self.protein_coverage_plot:
                         self.curr_protein_ids = prot_id
@@ -1277,7 +1468,8 @@ class MainTab(object):
                     self.colorscale_qualitative.value,
                     self.colorscale_sequential.value,
                     r"\[(.*?)\]|\((.*?)\)\)?",
-                    self.curr_protein_ids
+                    self.curr_protein_ids,
+                    self.data.peptide_mapping
                 )
                 self.layout[6] = pn.Pane(
                     one_peptide_coverage_plot,
@@ -1288,25 +1480,33 @@ class MainTab(object):
                 self.scan_number = [int(self.peptides_table.value.iloc[self.peptides_table.selection[0]]['MS/MS scan number'])]
                 if 'dda' in self.data.raw_data.acquisition_mode:
                     pasef_ids = [int(pasef_id) for pasef_id in self.data.mq_all_peptides[self.data.mq_all_peptides['MS/MS scan number'].isin(self.scan_number)]['Pasef MS/MS IDs'].values[0]]
-                    precursors = self.data.raw_data.fragment_frames[self.data.raw_data.fragment_frames.index.isin(pasef_ids)].copy()
-                    # quick fix the AlphaTims's bug with the differences in the Frames in raw_data.fragment_frames table for .d and .hdf files
-                    if self.data.ms_file_name.value.split('.')[-1] == 'hdf':
-                        precursors.loc[:, 'Frame'] -= 1
-                    self.merged_precursor_data = pd.merge(
-                        precursors, self.data.raw_data.precursors[self.data.raw_data.precursors.Id.isin(precursors.Precursor.values)],
-                        left_on='Precursor',
-                        right_on='Id'
+                    self.merged_precursor_data = alphaviz.preprocessing.get_pasef_frames(
+                        self.data.frame_topology,
+                        pasef_ids
                     )
-                    self.merged_precursor_data['Frame_Prec'] = list(zip(self.merged_precursor_data.Frame, self.merged_precursor_data.Precursor))
-                    self.ms1_ms2_frames = dict(zip(self.merged_precursor_data.Parent, self.merged_precursor_data.Frame_Prec))
-                    self.current_frame = list(self.ms1_ms2_frames.keys())[0]
+                    self.ms1_ms2_frames = dict(zip(
+                        self.merged_precursor_data.Parent.tolist(),
+                        zip(self.merged_precursor_data.Frame.tolist(), self.merged_precursor_data.Precursor.tolist())
+                    ))
+                    self.ms1_frames = list(self.ms1_ms2_frames.keys())
+                    self.current_frame_index = 0
+                    self.current_frame = self.ms1_frames[self.current_frame_index]
                     self.display_line_spectra_plots()
                     self.display_heatmap_spectrum()
                 else:
-                    self.ms2_frame = self.data.raw_data.fragment_frames[self.data.raw_data.fragment_frames.index.isin(self.scan_number)].Frame.values[0]
-                    if self.data.ms_file_name.value.split('.')[-1] == 'hdf':
-                        self.ms2_frame -= 1
-                    self.ms1_frame = self.data.raw_data.frames.loc[(self.data.raw_data.frames.MsMsType == 0) & (self.data.raw_data.frames.Id < self.ms2_frame), 'Id'].values[-1]
+                    try:
+                        self.ms2_frame = alphaviz.preprocessing.get_fragment_frame(
+                            self.data.frame_topology,
+                            self.scan_number[0]
+                        )
+                        self.ms1_frame = alphaviz.preprocessing.get_previous_ms1_frame(
+                            self.data.frame_topology,
+                            self.ms2_frame
+                        )
+                    except ValueError as error:
+                        print(f'The frames of the selected peptide cannot be displayed: {error}')
+                        self.peptides_table.loading = False
+                        return
                     self.peptide = {
                         "sequence":
                         self.peptides_table.value.iloc[self.peptides_table.selection[0]]['Sequence_AP_mod'],
@@ -1319,7 +1519,10 @@ class MainTab(object):
                     }
                     self.display_elution_profile_plots()
                     if not self.data.psm_df.empty:
-                        data_slice = self.data.psm_df.loc[(self.data.psm_df.spec_idx == self.peptides_table.value.iloc[self.peptides_table.selection[0]]['MS/MS scan number']) & (self.data.psm_df.sequence == self.peptides_table.value.iloc[self.peptides_table.selection[0]]['Sequence'])].copy()
+                        data_slice = self.data.get_psm(
+                            self.peptides_table.value.iloc[self.peptides_table.selection[0]]['MS/MS scan number'],
+                            self.peptides_table.value.iloc[self.peptides_table.selection[0]]['Sequence']
+                        )
                         predlib = self.data.model_mgr.predict_all(
                             data_slice,
                             predict_items=['rt', 'mobility'],
@@ -1424,6 +1627,7 @@ class MainTab(object):
                         precursor_indices,
                         conversion_dict[self.x_axis_label_mq.value],
                         colorscale_qualitative=self.colorscale_qualitative.value,
+                        sparse=True,
                     ),
                     sizing_mode='stretch_width',
                     config=update_config(title_renaming[self.x_axis_label_mq.value]),
@@ -1462,6 +1666,7 @@ class MainTab(object):
                             mz_tol=self.mz_tol.value,
                             rt_tol=self.rt_tol.value,
                             im_tol=self.im_tol.value,
+                            xic_cache=self.data.xic_cache,
                             title=f"Precursor and fragment elution profiles of {self.peptides_table.value.iloc[self.peptides_table.selection[0]]['Modified.Sequence']} in RT dimension ({self.peptide['rt'] / 60:.2f} min)",
                             colorscale_qualitative=self.colorscale_qualitative.value,
                             colorscale_sequential=self.colorscale_sequential.value,
@@ -1484,6 +1689,7 @@ class MainTab(object):
                                 mz_tol=self.mz_tol.value,
                                 rt_tol=self.rt_tol.value,
                                 im_tol=self.im_tol.value,
+                                xic_cache=self.data.xic_cache,
                                 n_cols=8,
                                 width=180,
                                 height=180,
@@ -1501,7 +1707,7 @@ class MainTab(object):
                     margin=(5, 10, 0, 10)
                 )
 
-    def display_heatmap_spectrum(self, *args):
+    def display_heatmap_spectrum(self, *args, update_spectrum=True):
         if self.ms1_ms2_frames or self.ms1_frame:
             if self.analysis_software == 'maxquant':
                 ms1_frame = self.current_frame
@@ -1515,8 +1721,10 @@ class MainTab(object):
                 mz = self.peptide['mz']
                 im = self.peptide['im']
             try:
-                self.heatmap_ms1_plot = alphaviz.plotting.plot_heatmap(
-                    self.data.raw_data[ms1_frame],
+                self.heatmap_ms1_plot = alphaviz.plotting.plot_frame_heatmap(
+                    self.data.raw_data,
+                    ms1_frame,
+                    heatmap_cache=self.data.heatmap_cache,
                     mz=mz,
                     im=im,
                     x_axis_label=self.heatmap_x_axis.value,
@@ -1530,8 +1738,10 @@ class MainTab(object):
                     height=450,
                     margin=(0, 10, 10, 0),
                 )
-                self.heatmap_ms2_plot = alphaviz.plotting.plot_heatmap(
-                    self.data.raw_data[ms2_frame],
+                self.heatmap_ms2_plot = alphaviz.plotting.plot_frame_heatmap(
+                    self.data.raw_data,
+                    ms2_frame,
+                    heatmap_cache=self.data.heatmap_cache,
                     x_axis_label=self.heatmap_x_axis.value,
                     y_axis_label=self.heatmap_y_axis.value,
                     title=f'MS2 frame(s) #{ms2_frame}',
@@ -1584,7 +1794,15 @@ class MainTab(object):
                     self.layout[9][0] = self.previous_frame
                     self.layout[9][1] = self.next_frame
                     self.layout[11] = self.plot_overlapped_frames
-                self.display_mass_spectrum()
+                if update_spectrum:
+                    self.display_mass_spectrum()
+
+    def update_heatmaps_style(self, *args):
+        # the frames are already aggregated in the heatmap cache, only the heatmaps are shaded again
+        if self.analysis_software == 'maxquant' and self.plot_overlapped_frames.value:
+            self.display_overlapped_frames()
+        else:
+            self.display_heatmap_spectrum(update_spectrum=False)
 
     def display_mass_spectrum(self, *args):
         data_ions = alphaviz.preprocessing.get_mq_ms2_scan_data(
@@ -1596,7 +1814,10 @@ class MainTab(object):
         predicted_df = pd.DataFrame(columns=['FragmentMz', 'RelativeIntensity','ions'])
         rt_pred, im_pred = float(), float()
         if not self.data.psm_df.empty and self.show_mirrored_plot.value:
-            data_slice = self.data.psm_df.loc[(self.data.psm_df.spec_idx == self.peptides_table.value.iloc[self.peptides_table.selection[0]]['MS/MS scan number']) & (self.data.psm_df.sequence == self.peptides_table.value.iloc[self.peptides_table.selection[0]]['Sequence'])].copy()
+            data_slice = self.data.get_psm(
+                self.peptides_table.value.iloc[self.peptides_table.selection[0]]['MS/MS scan number'],
+                self.peptides_table.value.iloc[self.peptides_table.selection[0]]['Sequence']
+            )
             predlib = self.data.model_mgr.predict_all(
                 data_slice,
                 predict_items=['ms2', 'rt', 'mobility'],
@@ -1644,11 +1865,8 @@ class MainTab(object):
             self.layout[14][0].loading = True
         except IndexError:
             pass
-        current_frame_index = list(self.ms1_ms2_frames.keys()).index(self.current_frame)
-        if current_frame_index == 0:
-            self.current_frame = list(self.ms1_ms2_frames.keys())[-1]
-        else:
-            self.current_frame = list(self.ms1_ms2_frames.keys())[current_frame_index - 1]
+        self.current_frame_index = (self.current_frame_index - 1) % len(self.ms1_frames)
+        self.current_frame = self.ms1_frames[self.current_frame_index]
         if self.plot_overlapped_frames.value == True:
             self.plot_overlapped_frames.value = False
         else:
@@ -1661,11 +1879,8 @@ class MainTab(object):
             self.layout[14][0].loading = True
         except IndexError:
             pass
-        current_frame_index = list(self.ms1_ms2_frames.keys()).index(self.current_frame)
-        if current_frame_index == len(self.ms1_ms2_frames.keys())-1:
-            self.current_frame = list(self.ms1_ms2_frames.keys())[0]
-        else:
-            self.current_frame = list(self.ms1_ms2_frames.keys())[current_frame_index + 1]
+        self.current_frame_index = (self.current_frame_index + 1) % len(self.ms1_frames)
+        self.current_frame = self.ms1_frames[self.current_frame_index]
         if self.plot_overlapped_frames.value == True:
             self.plot_overlapped_frames.value = False
         else:
@@ -1685,21 +1900,25 @@ class MainTab(object):
             mz = float(self.peptides_table.value.iloc[self.peptides_table.selection[0]]['m/z'])
             im = float(self.peptides_table.value.iloc[self.peptides_table.selection[0]]['1/K0'])
             try:
-                self.heatmap_ms1_plot = alphaviz.plotting.plot_heatmap(
-                    self.data.raw_data[list(self.ms1_ms2_frames.keys())],
+                self.heatmap_ms1_plot = alphaviz.plotting.plot_frame_heatmap(
+                    self.data.raw_data,
+                    self.ms1_frames,
+                    heatmap_cache=self.data.heatmap_cache,
                     mz=mz,
                     im=im,
                     x_axis_label=self.heatmap_x_axis.value,
                     y_axis_label=self.heatmap_y_axis.value,
-                    title=f'MS1 frame(s) #{list(self.ms1_ms2_frames.keys())}',
+                    title=f'MS1 frame(s) #{self.ms1_frames}',
                     colormap=self.heatmap_colormap.value,
                     background_color=self.heatmap_background_color.value,
                     width=570,
                     height=450,
                     margin=(0, 10, 10, 0),
                 )
-                self.heatmap_ms2_plot = alphaviz.plotting.plot_heatmap(
-                    self.data.raw_data[[val[0] for val in self.ms1_ms2_frames.values()]],
+                self.heatmap_ms2_plot = alphaviz.plotting.plot_frame_heatmap(
+                    self.data.raw_data,
+                    [val[0] for val in self.ms1_ms2_frames.values()],
+                    heatmap_cache=self.data.heatmap_cache,
                     x_axis_label=self.heatmap_x_axis.value,
                     y_axis_label=self.heatmap_y_axis.value,
                     title=f'MS2 frame(s) #{[val[0] for val in self.ms1_ms2_frames.values()]}',
@@ -1774,8 +1993,38 @@ class MainTab(object):
             )
 
     def update_plots_color(self, *args):
-        self.display_chromatogram()
-        self.run_after_protein_selection()
+        # the shown figures are recoloured in place, their data are neither extracted nor sent again
+        plots = [(self.chromatograms_plot, alphaviz.plotting.restyle_traces)]
+        if self.layout:
+            plots.append((self.layout[6], alphaviz.plotting.restyle_sequence_coverage))
+            if isinstance(self.layout[8], pn.Row) and len(self.layout[8]) > 1:
+                plots.append((self.layout[8][1], alphaviz.plotting.restyle_traces))
+        for pane, restyle in plots:
+            if isinstance(pane, pn.pane.Plotly) and pane.object is not None:
+                restyle(
+                    pane.object,
+                    self.colorscale_qualitative.value,
+                    self.colorscale_sequential.value
+                )
+                pane.param.trigger('object')
+        # the coverage plot of the protein is shown again when the peptide is deselected
+        if self.protein_coverage_plot is not None:
+            alphaviz.plotting.restyle_sequence_coverage(
+                self.protein_coverage_plot,
+                self.colorscale_qualitative.value,
+                self.colorscale_sequential.value
+            )
+
+    def update_plots_config(self, *args):
+        # the image save settings of the shown figures are updated, the figures are not recreated
+        panes = [self.chromatograms_plot]
+        if self.layout:
+            panes.extend(self.layout.select(pn.pane.Plotly))
+        for pane in panes:
+            if isinstance(pane, pn.pane.Plotly) and pane.config:
+                pane.config = update_config(
+                    pane.config['toImageButtonOptions']['filename']
+                )
 
 
 class QCTab(object):
@@ -1784,6 +2033,7 @@ class QCTab(object):
         self.data = data
         self.mz_tol = options.layout[0][0][0]
         self.layout_qc = None
+        self.mass_dens_plot = None
         self.analysis_software = self.data.settings.get('analysis_software')
         self.distribution_axis = pn.widgets.Select(
             name='Select the variable:',
@@ -1798,7 +2048,7 @@ class QCTab(object):
 
     def create_layout(self):
         dependances = {
-            self.mz_tol: [self.display_mass_density_plot, 'value'],
+            self.mz_tol: [self.update_mass_density_tolerance, 'value'],
             self.distribution_axis: [self.display_distribution_plot, 'value'],
             self.mass_density_axis: [self.display_mass_density_plot, 'value'],
         }
@@ -1811,8 +2061,8 @@ class QCTab(object):
         experiment = self.data.ms_file_name.value.split('.')[0]
         if self.analysis_software == 'maxquant':
             self.mass_density_axis.options = ['Uncalibrated mass error [ppm]', 'Mass error [ppm]']
-            self.distribution_axis.options = ['m/z', 'Charge', 'Length', 'Mass', '1/K0', 'CCS', 'K0 length', 'Missed cleavages', 'Andromeda score', 'Intensity', 'Mass error [ppm]', 'Mass error [Da]', 'Uncalibrated mass error [ppm]', 'Uncalibrated mass error [Da]', 'Score', '(EXP) # peptides']
-            self.distribution_axis.value = ['m/z']
+            self.distribution_axis.options = sum(QC_DISTRIBUTION_COLUMNS['maxquant'].values(), [])
+            self.distribution_axis.value = 'm/z'
 
             self.layout_qc = pn.Column(
                 pn.widgets.Tabulator(
@@ -1849,8 +2099,8 @@ class QCTab(object):
                 align='start',
             )
         elif self.analysis_software == 'diann':
-            self.distribution_axis.options = ['m/z', 'Charge', 'Length', 'IM', 'CScore', 'Decoy.CScore', 'Decoy.Evidence', 'Evidence', 'Global.Q.Value', 'Q.Value', 'Quantity.Quality', 'Spectrum.Similarity', '(EXP) # peptides', 'Global.PG.Q.Value', 'PG.Q.Value', 'PG.Quantity', 'Protein.Q.Value']
-            self.distribution_axis.value = ['m/z']
+            self.distribution_axis.options = sum(QC_DISTRIBUTION_COLUMNS['diann'].values(), [])
+            self.distribution_axis.value = 'm/z'
 
             self.layout_qc = pn.Column(
                 pn.widgets.Tabulator(
@@ -1895,50 +2145,42 @@ class QCTab(object):
                 self.layout_qc[2][0][1].loading = True
 
             mass_dens_plot_title = 'Uncalibrated mass density plot' if 'Uncalibrated' in self.mass_density_axis.value else 'Calibrated mass density plot'
-            if self.mass_density_axis.value == 'Uncalibrated mass error [ppm]':
-                mass_dens_plot = pn.Pane(
-                    alphaviz.plotting.plot_mass_error(
-                        self.data.mq_evidence,
-                        'm/z',
-                        self.mass_density_axis.value,
-                        mass_dens_plot_title,
-                        self.mz_tol.value,
-                    ),
-                    loading=False,
-                    config=update_config(f'{mass_dens_plot_title} plot'),
-                    margin=(0, 0, 0, 30),
-                )
-            else:
-                mass_dens_plot = pn.Pane(
-                    alphaviz.plotting.plot_mass_error(
-                        self.data.mq_evidence,
-                        'm/z',
-                        self.mass_density_axis.value,
-                        mass_dens_plot_title,
-                    ),
-                    loading=False,
-                    config=update_config(f'{mass_dens_plot_title} plot'),
-                    margin=(0, 0, 0, 30),
-                )
+            self.mass_dens_plot = pn.Pane(
+                alphaviz.plotting.plot_mass_error(
+                    self.data.mq_evidence,
+                    'm/z',
+                    self.mass_density_axis.value,
+                    mass_dens_plot_title,
+                    self.mz_tol.value if self.mass_density_axis.value == 'Uncalibrated mass error [ppm]' else None,
+                ),
+                loading=False,
+                config=update_config(f'{mass_dens_plot_title} plot'),
+                margin=(0, 0, 0, 30),
+            )
             if self.layout_qc:
-                self.layout_qc[2][0][1] = mass_dens_plot
+                self.layout_qc[2][0][1] = self.mass_dens_plot
             else:
-                return mass_dens_plot
+                return self.mass_dens_plot
+
+    def update_mass_density_tolerance(self, *args):
+        # only the tolerance lines in the layout change, the density and the points are not sent again
+        if self.mass_dens_plot is not None and self.mass_density_axis.value == 'Uncalibrated mass error [ppm]':
+            alphaviz.plotting.update_mass_error_tolerance(
+                self.mass_dens_plot.object,
+                self.mz_tol.value
+            )
+            self.mass_dens_plot.param.trigger('object')
 
     def display_distribution_plot(self, *args):
         if self.layout_qc:
             self.layout_qc[2][1][1].loading = True
 
-        if self.analysis_software == 'maxquant':
-            if self.distribution_axis.value in ['Score', '(EXP) # peptides']:
-                data = self.data.mq_protein_groups
-            else:
-                data = self.data.mq_evidence
-        elif self.analysis_software == 'diann':
-            if self.distribution_axis.value in ['(EXP) # peptides', 'Global.PG.Q.Value', 'PG.Q.Value', 'PG.Quantity', 'Protein.Q.Value']:
-                data = self.data.diann_proteins
-            else:
-                data = self.data.diann_peptides
+        # the distributions are drawn from the statistics precomputed when the data were loaded
+        data = self.data.qc_statistics.get(self.distribution_axis.value)
+        if data is None:
+            for table_name, columns in QC_DISTRIBUTION_COLUMNS[self.analysis_software].items():
+                if self.distribution_axis.value in columns:
+                    data = getattr(self.data, table_name)
 
         if self.distribution_axis.value == 'Score':
             title = f'Protein {self.distribution_axis.value.lower()} distribution'
@@ -2248,10 +2490,10 @@ class TargetModeTab(object):
                         for val in ['name', 'sequence']:
                             self.peptide_manual[val] = str(self.peptide_manual[val])
                         self.peptide_manual['mz'] = alphaviz.utils.calculate_mz(
-                            prec_mass=alphaviz.utils.get_precmass(
-                                alphaviz.utils.parse(self.peptide_manual['sequence']),
+                            prec_mass=alphaviz.utils.get_peptide_fragments(
+                                self.peptide_manual['sequence'],
                                 self.data.mass_dict
-                            ),
+                            )['precmass'],
                             charge=self.peptide_manual['charge']
                         )
                     except:
@@ -2267,6 +2509,7 @@ class TargetModeTab(object):
                                     mz_tol=self.mz_tol.value,
                                     rt_tol=self.rt_tol.value,
                                     im_tol=self.im_tol.value,
+                                    xic_cache=self.data.xic_cache,
                                     title=f"Precursor and fragment elution profiles of {self.peptide_manual['name']}({self.peptide_manual['sequence']}) in RT and RT/IM dimensions ({self.peptide_manual['rt'] / 60:.2f} min)",
                                     colorscale_qualitative=self.colorscale_qualitative.value,
                                     colorscale_sequential=self.colorscale_sequential.value,
@@ -2287,6 +2530,7 @@ class TargetModeTab(object):
                                     mz_tol=self.mz_tol.value,
                                     rt_tol=self.rt_tol.value,
                                     im_tol=self.im_tol.value,
+                                    xic_cache=self.data.xic_cache,
                                     n_cols=8,
                                     width=180,
                                     height=180,
@@ -2442,6 +2686,7 @@ class TargetModeTab(object):
                                 mz_tol=self.mz_tol.value,
                                 rt_tol=self.rt_tol.value,
                                 im_tol=self.im_tol.value,
+                                xic_cache=self.data.xic_cache,
                                 calculate_fragment_masses=False,
                                 title=f"Precursor and fragment elution profiles of peptide {self.peptide_prediction['sequence']} in RT and RT/IM dimensions ({self.peptide_prediction['rt'] / 60:.2f} min)",
                                 colorscale_qualitative=self.colorscale_qualitative.value,
@@ -2464,6 +2709,7 @@ class TargetModeTab(object):
                                 mz_tol=self.mz_tol.value,
                                 rt_tol=self.rt_tol.value,
                                 im_tol=self.im_tol.value,
+                                xic_cache=self.data.xic_cache,
                                 n_cols=8,
                                 width=180,
                                 height=180,
@@ -2525,6 +2771,7 @@ class GUI(object):
         self.automatic_close = automatic_close
 
     def start_server(self, run_in_background=False):
+        import bokeh.server.views.ws
         if self.automatic_close:
             bokeh_ws_handler = bokeh.server.views.ws.WSHandler
             self.bokeh_server_open = bokeh_ws_handler.open
@@ -2557,6 +2804,7 @@ class GUI(object):
         return wrapper
 
     def stop_server(self):
+        import bokeh.server.views.ws
         logging.info("Stopping server...")
         self.server.stop()
         if self.automatic_close:
@@ -3,10 +3,13 @@
 This module provides functions to read MQ/DiaNN/AlphaPept output files and other IO supplementary functions.
 """
 
+import hashlib
 import logging
 import os
+import numpy as np
 import pandas as pd
 import alphaviz.preprocessing
+import alphaviz.utils
 
 
 def read_file(
@@ -658,3 +661,79 @@ def import_alphapept_output(
     ap_peptides = create_ap_peptides_table(ap_df)
 
     return ap_proteins, ap_peptides
+
+
+def get_sidecar_path(
+    raw_path: str,
+    suffix: str,
+    cache_path: str = alphaviz.utils.CACHE_PATH
+) -> str:
+    """Get the path of a sidecar file storing the data derived from the raw file. The name depends on the absolute path, the modification time and the size of the raw file, so that a changed raw file gets a new sidecar.
+
+    Parameters
+    ----------
+    raw_path : str
+        The path to the Bruker .d folder or the .hdf file.
+    suffix : str
+        The suffix of the sidecar file, e.g. 'chromatograms.npz'.
+    cache_path : str
+        The folder of the sidecar files. Default: alphaviz.utils.CACHE_PATH.
+
+    Returns
+    -------
+    str
+        The path to the sidecar file.
+    """
+    raw_path = os.path.abspath(raw_path)
+    stat_path = os.path.join(raw_path, 'analysis.tdf') if os.path.isdir(raw_path) else raw_path
+    stat = os.stat(stat_path)
+    key = hashlib.sha1(f"{raw_path}|{stat.st_mtime_ns}|{stat.st_size}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(
+        cache_path,
+        f"{os.path.splitext(os.path.basename(raw_path))[0]}_{key}_{suffix}"
+    )
+
+
+def import_chromatograms(
+    raw_path: str,
+    raw_data=None,  # alphatims.bruker.TimsTOF object
+    cache_path: str = alphaviz.utils.CACHE_PATH
+) -> dict:
+    """Load the chromatograms of the raw file from the sidecar file or calculate them with the alphaviz.preprocessing.get_chromatograms function and save the sidecar file.
+
+    Parameters
+    ----------
+    raw_path : str
+        The path to the Bruker .d folder or the .hdf file.
+    raw_data : alphatims.bruker.TimsTOF object
+        The loaded raw file, used only if there is no sidecar file. Default: None.
+    cache_path : str
+        The folder of the sidecar files. Default: alphaviz.utils.CACHE_PATH.
+
+    Returns
+    -------
+    dict
+        The chromatograms as returned by alphaviz.preprocessing.get_chromatograms or None if there is neither a sidecar file nor raw_data.
+    """
+    try:
+        sidecar_path = get_sidecar_path(raw_path, 'chromatograms.npz', cache_path)
+    except OSError:
+        sidecar_path = None
+    if sidecar_path and os.path.isfile(sidecar_path):
+        try:
+            with np.load(sidecar_path) as sidecar:
+                return {
+                    key: (value if value.ndim else value.item()) for key, value in sidecar.items()
+                }
+        except (OSError, ValueError):
+            logging.warning(f"The chromatogram sidecar file {sidecar_path} cannot be read.")
+    if raw_data is None:
+        return None
+    chromatograms = alphaviz.preprocessing.get_chromatograms(raw_data)
+    if sidecar_path:
+        try:
+            os.makedirs(cache_path, exist_ok=True)
+            np.savez(sidecar_path, **chromatograms)
+        except OSError:
+            logging.warning(f"The chromatogram sidecar file {sidecar_path} cannot be saved.")
+    return chromatograms
@@ -3,6 +3,7 @@
 This module provides the plotting functions used by AlphaViz.
 """
 import re
+import typing
 
 import numpy as np
 import pandas as pd
@@ -11,13 +12,31 @@ import plotly.graph_objects as go
 import plotly.subplots
 import plotly.express as px
 
-import holoviews as hv
-from holoviews.operation.datashader import dynspread, rasterize, shade
-from bokeh.io import export_svgs
-
 import alphaviz.preprocessing
 import alphaviz.utils
 
+if typing.TYPE_CHECKING:
+    # holoviews is slow to import and only loaded by the functions using it
+    import holoviews as hv
+
+# the minimal tolerances used to extract the peaks of a peptide for the cached elution profiles
+XIC_ENVELOPE_TOLERANCES = {
+    'mz_tol': 50,  # ppm
+    'rt_tol': 60,  # sec
+    'im_tol': 0.1,
+}
+
+
+def _get_colors(
+    n_colors: int,
+    colorscale_qualitative: str,
+    colorscale_sequential: str = None
+) -> list:
+    colors = getattr(px.colors.qualitative, colorscale_qualitative)
+    if n_colors <= len(colors) or colorscale_sequential is None:
+        return colors[:n_colors]
+    return px.colors.sample_colorscale(colorscale_sequential, samplepoints=n_colors)
+
 
 def plot_sequence_coverage(
     sequence: str,
@@ -26,7 +45,8 @@ def plot_sequence_coverage(
     colorscale_qualitative: str,
     colorscale_sequential: str,
     regex: str,
-    prot_id: str = ""
+    prot_id: str = "",
+    peptide_mapping: pd.DataFrame = None
 ) -> go.Figure:
     """Create a protein sequence coverage plot.
 
@@ -44,6 +64,11 @@ def plot_sequence_coverage(
         A name of a built-in sequential Plotly color scale.
     regex : str
         A regular expression to be applied for the peptide sequence.
+    prot_id : str
+        The protein ID. Default: "".
+    peptide_mapping : pd.DataFrame
+        The positions of the peptides in the proteins obtained with the alphaviz.preprocessing.map_peptides_to_proteins function for the naked peptide sequences. All positions of a peptide in the protein prot_id are shown. If None or empty, the first position of each peptide in the sequence is shown. Default: None.
+
     Returns
     -------
     plotly.graph_objects.Figure object
@@ -69,51 +94,60 @@ def plot_sequence_coverage(
             marker_color='grey'
         )
     )
-    selected_peptide_cov = np.zeros(len(sequence), dtype=np.bool)
-    if len(peptides_list) <= len(getattr(px.colors.qualitative, colorscale_qualitative)):
-        for ind, peptide_mod in enumerate(peptides_list):
-            peptide_mod = peptide_mod.replace('_', '')
-            peptide = re.sub(regex, "", peptide_mod)
-            start = sequence.find(peptide)
-            peptide_cov = range(start + 1, start + len(peptide) + 1)
-            selected_peptide_cov[start + 1: start + len(peptide) + 1] = True
-            if start != -1:
-                fig.add_trace(
-                    go.Bar(
-                        x=list(peptide_cov),
-                        y=np.ones(len(peptide))*2,
-                        name=f'Peptide: {peptide_mod}',
-                        hovertemplate='<br><b>position:</b> %{x}.',
-                        opacity=0.5,
-                        marker=dict(color=getattr(px.colors.qualitative, colorscale_qualitative)[ind])
-                    )
-                )
-            else:
-                print(f'The peptide {peptide} is not found in the protein sequence of the protein_id {prot_id}.')
-                return None
+    peptides_mod = [peptide_mod.replace('_', '') for peptide_mod in peptides_list]
+    peptides = [re.sub(regex, "", peptide_mod) for peptide_mod in peptides_mod]
+    if peptide_mapping is not None and len(peptide_mapping) > 0:
+        # the same positions as in the proteins table, i.e. all occurrences and isoleucine/leucine treated as identical
+        positions = pd.merge(
+            pd.DataFrame({'peptide': peptides, 'peptide_mod': peptides_mod}),
+            peptide_mapping.loc[peptide_mapping.protein_id == prot_id, ['peptide', 'start', 'end']],
+            on='peptide',
+            how='left',
+            sort=False
+        )
+        if positions.start.isna().any():
+            print(f'The peptide {positions.peptide[positions.start.isna()].iloc[0]} is not found in the protein sequence of the protein_id {prot_id}.')
+            return None
     else:
-        colorscale_sequential_colors = px.colors.sample_colorscale(colorscale_sequential, samplepoints=len(peptides_list))
-        for ind, peptide_mod in enumerate(peptides_list):
-            peptide_mod = peptide_mod.replace('_', '')
-            peptide = re.sub(regex, "", peptide_mod)
-            start = sequence.find(peptide)
-            peptide_cov = range(start + 1, start + len(peptide) + 1)
-            selected_peptide_cov[start + 1: start + len(peptide) + 1] = True
-            if start != -1:
-                fig.add_trace(
-                    go.Bar(
-                        x=list(peptide_cov),
-                        y=np.ones(len(peptide))*2,
-                        name=f'Peptide: {peptide_mod}',
-                        hovertemplate='<br><b>position:</b> %{x}.',
-                        opacity=0.5,
-                        marker=dict(color=colorscale_sequential_colors[ind])
-                    )
-                )
-            else:
-                print(f'The peptide {peptide} is not found in the protein sequence of the protein_id {prot_id}.')
-                return None
-    aa_coverage = round(np.sum(selected_peptide_cov) / len(selected_peptide_cov) * 100, 2)
+        starts = np.array([sequence.find(peptide) for peptide in peptides], dtype=np.int64)
+        if np.any(starts == -1):
+            print(f'The peptide {peptides[np.flatnonzero(starts == -1)[0]]} is not found in the protein sequence of the protein_id {prot_id}.')
+            return None
+        positions = pd.DataFrame({
+            'peptide': peptides,
+            'peptide_mod': peptides_mod,
+            'start': starts,
+            'end': starts + np.array([len(peptide) for peptide in peptides], dtype=np.int64)
+        })
+    # the PSMs of the same peptide (e.g. several charge states or modified forms) are drawn as one bar
+    positions = positions.groupby(['peptide', 'start', 'end'], sort=False).peptide_mod.agg(
+        lambda peptide_mods: ', '.join(pd.unique(peptide_mods))
+    ).reset_index()
+    peptides_mod = positions.peptide_mod.tolist()
+    starts = positions.start.values.astype(np.int64)
+    lengths = positions.end.values.astype(np.int64) - starts
+    lanes = alphaviz.preprocessing.pack_intervals(starts, starts + lengths)
+    # all peptides are drawn by one trace of horizontal bars spanning their residues, the overlapping peptides are stacked
+    fig.add_trace(
+        go.Bar(
+            base=starts + 0.5,
+            x=lengths,
+            y=1.5 + lanes,
+            width=0.8,
+            orientation='h',
+            customdata=np.stack([starts + 1, starts + lengths], axis=1) if len(starts) else None,
+            hovertext=peptides_mod,
+            hovertemplate='<b>Peptide:</b> %{hovertext};<br><b>position:</b> %{customdata[0]}-%{customdata[1]}.',
+            name='Peptides',
+            opacity=0.5,
+        )
+    )
+    restyle_sequence_coverage(fig, colorscale_qualitative, colorscale_sequential)
+    aa_coverage = round(
+        np.sum(alphaviz.preprocessing.get_interval_coverage(starts, starts + lengths, len(sequence))) / len(sequence) * 100,
+        2
+    )
+    n_lanes = int(lanes.max()) + 1 if len(lanes) else 1
     fig.update_layout(
         title=dict(
             text=f"Protein coverage diagram (protein ID {prot_id})" + '\n' + f"(AA coverage {aa_coverage}%)",
@@ -134,28 +168,94 @@ def plot_sequence_coverage(
         barmode='overlay',
         bargap=0,  # gap between bars of adjacent location coordinates.
         bargroupgap=0,  # gap between bars of the same location coordinate.
-        hovermode="x",
+        hovermode="closest",
         template="plotly_white",  # "plotly", "plotly_white", "plotly_dark", "ggplot2", "seaborn", "simple_white"
         # width=1000,
-        height=200
+        height=200 + 20 * max(n_lanes - 2, 0)
     )
 
-    fig.update_yaxes(range=[-1, 3])
+    fig.update_yaxes(range=[-1, max(3, n_lanes + 1)])
     fig.update_layout(showlegend=False)
 
     return fig
 
 
+def restyle_sequence_coverage(
+    fig: go.Figure,
+    colorscale_qualitative: str,
+    colorscale_sequential: str
+) -> go.Figure:
+    """Colour the peptides of a protein sequence coverage plot in place, without changing its data.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure object
+        The figure created by the plot_sequence_coverage function.
+    colorscale_qualitative : str
+        A name of a built-in qualitative Plotly color scale.
+    colorscale_sequential : str
+        A name of a built-in sequential Plotly color scale, used if the qualitative one has fewer colors than peptides.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure object
+        The restyled figure.
+
+    """
+    fig.update_traces(
+        marker_color=_get_colors(len(fig.data[1].x), colorscale_qualitative, colorscale_sequential),
+        selector=dict(name='Peptides')
+    )
+    return fig
+
+
+CHROMATOGRAM_TYPES = [
+    ('Total Ion Chromatogram - MS1', 'ms1_tic'),
+    ('Base Peak Chromatogram - MS1', 'ms1_bpc'),
+    ('Total Ion Chromatogram - MS2', 'ms2_tic'),
+    ('Base Peak Chromatogram - MS2', 'ms2_bpc')
+]
+
+
+def _get_chrom_lines(
+    chromatograms: dict,
+    max_points: int,
+    rt_range: tuple = None
+) -> list:
+    lines = []
+    for chrom_type, chrom in CHROMATOGRAM_TYPES:
+        rt_values = chromatograms[f'{chrom[:3]}_rt']
+        intensities = chromatograms[chrom]
+        if rt_range is not None:
+            in_range = (rt_values >= rt_range[0]) & (rt_values <= rt_range[1])
+            rt_values, intensities = rt_values[in_range], intensities[in_range]
+        rt_values, intensities = alphaviz.preprocessing.downsample_min_max(
+            rt_values,
+            intensities,
+            max_points
+        )
+        lines.append((chrom_type, rt_values, intensities))
+    return lines
+
+
 def plot_chrom(
-    data,  # alphatims.bruker.TimsTOF object
+    data,  # alphatims.bruker.TimsTOF object or dict
     colorscale_qualitative: str,
+    max_points: int = 5000,
+    rt_range: tuple = None,
 ) -> go.Figure:
     """Create a plot showing 4 chromatogram types: total ion chromatogram (TIC) and base peak chromatogram (BPC) for MS1 and MS2 raw data.
 
     Parameters
     ----------
-    data : alphatims.bruker.TimsTOF object
-        An Alphatims.bruker.TimsTOF object.
+    data : alphatims.bruker.TimsTOF object or dict
+        An Alphatims.bruker.TimsTOF object or the chromatograms obtained with alphaviz.preprocessing.get_chromatograms (e.g. from a sidecar file).
+    colorscale_qualitative : str
+        The name of the Plotly qualitative color scale.
+    max_points : int
+        The maximal number of points per chromatogram, the chromatograms are downsampled keeping the minimum and maximum intensities (see alphaviz.preprocessing.downsample_min_max). Default: 5000.
+    rt_range : tuple
+        The (start, end) retention time range (in min) to show, e.g. the zoomed range of the plot. Default: None (the whole run).
 
     Returns
     -------
@@ -164,34 +264,23 @@ def plot_chrom(
 
     """
 
-    chrom_ms1 = data.frames.query('MsMsType == 0')[['Time', 'SummedIntensities', 'MaxIntensity']]
-    chrom_ms1['RT'] = chrom_ms1['Time'] / 60
-    chrom_ms2 = data.frames.query('MsMsType != 0')[['Time', 'SummedIntensities', 'MaxIntensity']]
-    chrom_ms2['RT'] = chrom_ms2['Time'] / 60
+    if isinstance(data, dict):
+        chromatograms = data
+    else:
+        chromatograms = alphaviz.preprocessing.get_chromatograms(data)
 
     fig = go.Figure()
 
-    total_ion_col = ['RT', 'SummedIntensities']
-    base_peak_col = ['RT', 'MaxIntensity']
-
-    for i, chrom_type in enumerate(['Total Ion Chromatogram - MS1', 'Base Peak Chromatogram - MS1', 'Total Ion Chromatogram - MS2', 'Base Peak Chromatogram - MS2']):
-        if chrom_type == 'Total Ion Chromatogram - MS1':
-            data = chrom_ms1[total_ion_col]
-        elif chrom_type == 'Total Ion Chromatogram - MS2':
-            data = chrom_ms2[total_ion_col]
-        elif chrom_type == 'Base Peak Chromatogram - MS1':
-            data = chrom_ms1[base_peak_col]
-        elif chrom_type == 'Base Peak Chromatogram - MS2':
-            data = chrom_ms2[base_peak_col]
+    for chrom_type, rt_values, intensities in _get_chrom_lines(chromatograms, max_points, rt_range):
         fig.add_trace(
             go.Scatter(
-                x=data.iloc[:, 0],
-                y=data.iloc[:, 1],
+                x=rt_values,
+                y=intensities,
                 name=chrom_type,
                 hovertemplate='<b>RT:</b> %{x};<br><b>Intensity:</b> %{y}.',
-                marker=dict(color=getattr(px.colors.qualitative, colorscale_qualitative)[i]),
             )
         )
+    restyle_traces(fig, colorscale_qualitative)
 
     fig.update_layout(
         title=dict(
@@ -229,12 +318,79 @@ def plot_chrom(
         height=450
     )
 
-    fig.update_xaxes(range=[0, max(chrom_ms1.RT.max(), chrom_ms2.RT.max())])
+    if rt_range is None:
+        rt_range = [0, chromatograms['rt_end']]
+    fig.update_xaxes(range=list(rt_range))
+    return fig
+
+
+def update_chrom_range(
+    fig: go.Figure,
+    chromatograms: dict,
+    rt_range: tuple = None,
+    max_points: int = 5000
+) -> go.Figure:
+    """Replace the points of the chromatograms created by plot_chrom in place with the points of the retention time range, keeping the rest of the figure (e.g. the y-range or the traces hidden in the legend).
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure object
+        The figure created by the plot_chrom function.
+    chromatograms : dict
+        The chromatograms obtained with alphaviz.preprocessing.get_chromatograms.
+    rt_range : tuple
+        The (start, end) retention time range (in min), e.g. the zoomed range of the plot. Default: None (the whole run).
+    max_points : int
+        The maximal number of points per chromatogram. Default: 5000.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure object
+        The updated figure.
+
+    """
+    with fig.batch_update():
+        for trace, (chrom_type, rt_values, intensities) in zip(
+            fig.data,
+            _get_chrom_lines(chromatograms, max_points, rt_range)
+        ):
+            trace.x = rt_values
+            trace.y = intensities
+        fig.layout.xaxis.range = list(rt_range) if rt_range is not None else [0, chromatograms['rt_end']]
+    return fig
+
+
+def restyle_traces(
+    fig: go.Figure,
+    colorscale_qualitative: str,
+    colorscale_sequential: str = None
+) -> go.Figure:
+    """Colour the traces of a figure in place, without changing their data. A trace with an integer meta value gets the color with this index, otherwise the color of its position, e.g. the chromatograms, line and elution profile plots.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure object
+        The figure to restyle.
+    colorscale_qualitative : str
+        A name of a built-in qualitative Plotly color scale.
+    colorscale_sequential : str
+        A name of a built-in sequential Plotly color scale, used if the qualitative one has fewer colors than the figure needs. The number of needed colors is taken from the 'n_colors' layout meta value if present. Default: None.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure object
+        The restyled figure.
+
+    """
+    n_colors = fig.layout.meta['n_colors'] if isinstance(fig.layout.meta, dict) else len(fig.data)
+    colors = _get_colors(n_colors, colorscale_qualitative, colorscale_sequential)
+    for i, trace in enumerate(fig.data):
+        trace.marker.color = colors[trace.meta if isinstance(trace.meta, int) else i]
     return fig
 
 
 def plot_heatmap(
-    df: pd.DataFrame,
+    df,
     x_axis_label: str = "m/z, Th",
     y_axis_label: str = "Inversed IM, V·s·cm\u207B\u00B2",
     z_axis_label: str = "Intensity",
@@ -248,13 +404,13 @@ def plot_heatmap(
     precursor_size: int = 15,
     colormap: str = 'fire',
     **kwargs
-) -> hv.Scatter:
+) -> 'hv.Scatter':
     """Create a heatmap for the MS1/MS2 frame that overlaps with the precursor mark at the location where the precursor has been selected for analysis.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        A slice of the alphatims.bruker.TimsTOF object with MS1 or MS2/PASEF frame data.
+    df : pd.DataFrame or function
+        A slice of the alphatims.bruker.TimsTOF object with MS1 or MS2/PASEF frame data or a function returning the 2D histogram of the frame(s) (as returned by alphaviz.preprocessing.get_frame_heatmap) for the (mz_range, im_range) shown in the plot, both None for the whole range.
     mz: float
         M/z value of the precursor identified in the frame.
     im: float
@@ -292,6 +448,9 @@ def plot_heatmap(
         A scatter plot projected on the 2 dimensions with markered position of the precursor.
 
     """
+    import holoviews as hv
+    from holoviews.operation.datashader import dynspread, rasterize, shade
+
     labels = {
         'm/z, Th': "mz_values",
         'Inversed IM, V·s·cm\u207B\u00B2': "mobility_values",
@@ -311,26 +470,46 @@ def plot_heatmap(
         hooks=[_change_plot],
         **kwargs
     )
-    dmap = hv.DynamicMap(
-        hv.Points(
-            df,
-            [x_dimension, y_dimension],
-            z_dimension
-        )
-    )
+    if callable(df):
+        def get_image(x_range, y_range):
+            ranges = {x_dimension: x_range, y_dimension: y_range}
+            heatmap = df(ranges['mz_values'], ranges['mobility_values'])
+            # the empty bins are transparent to show the background
+            intensities = np.where(heatmap['intensities'] > 0, heatmap['intensities'], np.nan)
+            if x_dimension == 'mobility_values':
+                intensities = intensities.T
+            return hv.Image(
+                (heatmap[x_dimension], heatmap[y_dimension], intensities),
+                [x_dimension, y_dimension],
+                z_dimension
+            )
 
-    agg = rasterize(
-        dmap,
-        width=width,
-        height=height,
-        aggregator='sum'
-    )
-    fig = dynspread(
-        shade(
-            agg,
+        # the histogram of the shown range is aggregated again on each zoom
+        fig = shade(
+            hv.DynamicMap(get_image, streams=[hv.streams.RangeXY()]),
             cmap=colormap
+        ).opts(plot=opts_ms1)
+    else:
+        dmap = hv.DynamicMap(
+            hv.Points(
+                df,
+                [x_dimension, y_dimension],
+                z_dimension
+            )
         )
-    ).opts(plot=opts_ms1)
+
+        agg = rasterize(
+            dmap,
+            width=width,
+            height=height,
+            aggregator='sum'
+        )
+        fig = dynspread(
+            shade(
+                agg,
+                cmap=colormap
+            )
+        ).opts(plot=opts_ms1)
 
     if mz and im:
         if x_dimension == 'mz_values' and y_dimension == 'mobility_values':
@@ -349,6 +528,60 @@ def plot_heatmap(
     return fig
 
 
+def plot_frame_heatmap(
+    timstof_data,  # alphatims.bruker.TimsTOF object
+    frames,
+    heatmap_cache=None,
+    mz_bins: int = 1000,
+    im_bins: int = 500,
+    **kwargs
+) -> 'hv.DynamicMap':
+    """Create a heatmap for the MS1/MS2 frame(s) from their 2D histogram, which is aggregated straight from the raw arrays for the range shown in the plot.
+
+    Parameters
+    ----------
+    timstof_data : alphatims.bruker.TimsTOF
+        An alphatims.bruker.TimsTOF data object.
+    frames : int or list of int
+        The frame index or the indices of the frames to overlap.
+    heatmap_cache : alphaviz.utils.LRUCache
+        A cache of the frame histograms, so that revisiting a frame or a zoom level does not aggregate it again. Default: None.
+    mz_bins : int
+        The maximal number of bins along the m/z axis. Default: 1000.
+    im_bins : int
+        The maximal number of bins along the ion mobility axis. Default: 500.
+    **kwargs
+        Additional keyword arguments to be passed to the plot_heatmap function.
+
+    Returns
+    -------
+    hv.DynamicMap
+        A heatmap of the frame projected on the 2 dimensions with markered position of the precursor.
+    """
+    data_key = getattr(timstof_data, 'bruker_d_folder_name', id(timstof_data))
+    frames_key = tuple(np.atleast_1d(frames).tolist())
+
+    def get_heatmap(mz_range, im_range):
+        mz_range = None if mz_range is None else tuple(mz_range)
+        im_range = None if im_range is None else tuple(im_range)
+        heatmap_key = (data_key, frames_key, mz_range, im_range, mz_bins, im_bins)
+        heatmap = None if heatmap_cache is None else heatmap_cache.get(heatmap_key)
+        if heatmap is None:
+            heatmap = alphaviz.preprocessing.get_frame_heatmap(
+                timstof_data,
+                frames,
+                mz_range=mz_range,
+                im_range=im_range,
+                mz_bins=mz_bins,
+                im_bins=im_bins
+            )
+            if heatmap_cache is not None:
+                heatmap_cache.put(heatmap_key, heatmap)
+        return heatmap
+
+    return plot_heatmap(get_heatmap, **kwargs)
+
+
 def _change_plot(plot, element):
     plot.state.toolbar.logo = None
 
@@ -362,7 +595,8 @@ def plot_line(
     y_axis_label: str = "intensity",
     remove_zeros: bool = False,
     trim: bool = True,
-    height: int = 400
+    height: int = 400,
+    sparse: bool = False
 ) -> go.Figure:
     """Plot an XIC, mobilogram or spectrum as a lineplot.
 
@@ -387,6 +621,8 @@ def plot_line(
         If True, zeros on the left and right are trimmed. Default is True.
     height : int
         Plot height. Default is 400.
+    sparse : bool
+        If True, only the occupied range of the axis is binned and the runs of zeros are collapsed to their first and last point, so that the size of the plot scales with the signal and not with the axis resolution. Default is False.
 
     Returns
     -------
@@ -408,42 +644,33 @@ def plot_line(
         'Inversed IM, V·s·cm\u207B\u00B2': "mobility_values",
     }
     x_dimension = labels[x_axis_label]
-    intensities = timstof_data.bin_intensities(selected_indices, [x_dimension])
+    x_ticks, intensities = alphaviz.preprocessing.get_line_profile(
+        timstof_data,
+        selected_indices,
+        x_dimension,
+        remove_zeros=remove_zeros,
+        trim=trim,
+        sparse=sparse
+    )
 
     if x_dimension == "mz_values":
-        x_ticks = timstof_data.mz_values
         plot_title = "Spectrum"
     elif x_dimension == "mobility_values":
-        x_ticks = timstof_data.mobility_values
         plot_title = "Mobilogram"
     elif x_dimension == "rt_values":
-        x_ticks = timstof_data.rt_values / 60
+        x_ticks = x_ticks / 60
         plot_title = "XIC"
-    non_zeros = np.flatnonzero(intensities)
-    if len(non_zeros) == 0:
-        x_ticks = np.empty(0, dtype=x_ticks.dtype)
-        intensities = np.empty(0, dtype=intensities.dtype)
-    else:
-        if remove_zeros:
-            x_ticks = x_ticks[non_zeros]
-            intensities = intensities[non_zeros]
-        elif trim:
-            start = max(0, non_zeros[0] - 1)
-            end = non_zeros[-1] + 2
-            x_ticks = x_ticks[start: end]
-            intensities = intensities[start: end]
     fig = go.Figure()
     fig.add_trace(
         go.Scatter(
             x=x_ticks,
             y=intensities,
             mode='lines',
-            text=[f'{x_axis_label}'.format(i + 1) for i in range(len(x_ticks))],
-            hovertemplate='<b>%{text}:</b> %{x};<br><b>Intensity:</b> %{y}.',
+            hovertemplate=f'<b>{x_axis_label}:</b> %{{x}};<br><b>Intensity:</b> %{{y}}.',
             name=" ",
-            marker=dict(color=getattr(px.colors.qualitative, colorscale_qualitative)[0])
         )
     )
+    restyle_traces(fig, colorscale_qualitative)
 
     fig.update_layout(
         title=dict(
@@ -472,6 +699,38 @@ def plot_line(
     return fig
 
 
+def _add_stems(
+    fig: go.Figure,
+    x: np.ndarray,
+    y: np.ndarray,
+    color: str,
+    width: float,
+    opacity: float = 1.
+) -> None:
+    # all stems are drawn by one line trace, each stem is separated from the next one by a NaN
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) == 0:
+        return
+    stems_x = np.repeat(x, 3)
+    stems_x[2::3] = np.nan
+    stems_y = np.zeros(3 * len(y))
+    stems_y[1::3] = y
+    stems_y[2::3] = np.nan
+    fig.add_trace(
+        go.Scatter(
+            x=stems_x,
+            y=stems_y,
+            mode='lines',
+            opacity=opacity,
+            line=dict(color=color, width=width),
+            hoverinfo='skip',
+            name='',
+            showlegend=False
+        )
+    )
+
+
 def plot_mass_spectra(
     data: pd.DataFrame,
     title: str,
@@ -586,42 +845,35 @@ def plot_mass_spectra(
                 showlegend=False
             )
         )
-        fig.update_layout(
-            shapes=[
-                dict(
-                    type='line',
-                    xref='x',
-                    yref='y',
-                    x0=predicted[0][i],
-                    y0=0,
-                    opacity=0.7,
-                    x1=predicted[0][i],
-                    y1=predicted[1][i],
-                    line=dict(
-                        color=b_ion_color if 'b' in predicted[2][i] else y_ion_color,
-                        width=spectrum_line_width
-                    )
-                ) for i in range(len(predicted[0]))
-            ],
-        )
+        predicted_ions = predicted[2].astype(str)
+        for is_selected, color in [
+            (predicted_ions.str.contains('b').values, b_ion_color),
+            (~predicted_ions.str.contains('b').values, y_ion_color)
+        ]:
+            _add_stems(
+                fig,
+                np.asarray(predicted[0])[is_selected],
+                np.asarray(predicted[1])[is_selected],
+                color=color,
+                width=spectrum_line_width,
+                opacity=0.7
+            )
 
-    fig.update_layout(
-        shapes=[
-            dict(
-                type='line',
-                xref='x',
-                yref='y',
-                x0=data.loc[i, 'mz_values'],
-                y0=0,
-                x1=data.loc[i, 'mz_values'],
-                y1=data.loc[i, 'intensity_values'],
-                line=dict(
-                    color=b_ion_color if 'b' in data.loc[i, 'ions'] else (y_ion_color if 'y' in data.loc[i, 'ions'] else spectrum_color),
-                    width=spectrum_line_width
-                )
-            ) for i in data.index
-        ]
-    )
+    ions = data.ions.astype(str)
+    is_b_ion = ions.str.contains('b').values
+    is_y_ion = ~is_b_ion & ions.str.contains('y').values
+    for is_selected, color in [
+        (~is_b_ion & ~is_y_ion, spectrum_color),
+        (is_y_ion, y_ion_color),
+        (is_b_ion, b_ion_color)
+    ]:
+        _add_stems(
+            fig,
+            data.mz_values.values[is_selected],
+            data.intensity_values.values[is_selected],
+            color=color,
+            width=spectrum_line_width
+        )
 
     fig.update_layout(
         template=template,
@@ -754,8 +1006,10 @@ def plot_complex_ms_plot(
     fig_common.update_xaxes(range=[data.mz_values.min()-10, data.mz_values.max()+10], row=4, col=1)
     fig_common.update_xaxes(range=[data.mz_values.min()-10, data.mz_values.max()+10], row=1, col=1)
 
-    bions = alphaviz.preprocessing.get_identified_ions(data.ions, sequence, 'b')
-    yions = alphaviz.preprocessing.get_identified_ions(data.ions, sequence, 'y')
+    bions, yions = alphaviz.preprocessing.get_ion_coverage_matrix(
+        data.ions.values,
+        len(sequence)
+    ) > 0
 
     sl = len(sequence)
     distance_from_side = (data.mz_values.max() - data.mz_values.min()) * 2/8
@@ -845,7 +1099,9 @@ def plot_mass_error(
     x_axis_label: str,
     y_axis_label: str,
     plot_title: str,
-    mz_tol: float = None
+    mz_tol: float = None,
+    max_points: int = 20000,
+    bins: int = 50
 ) -> go.Figure:
     """Create a density plot superimposed on the scatter plot together with the 1D distributions of both variables as marginal histograms.
 
@@ -859,6 +1115,12 @@ def plot_mass_error(
         The label of the y-axis.
     plot_title : str
         The title of the plot.
+    mz_tol : float
+        If specified, the m/z tolerance (ppm) is shown as two horizontal lines. Default: None.
+    max_points : int
+        The maximal number of points in the scatter plot, a random subset is shown for larger tables. Default: 20000.
+    bins : int
+        The number of bins along each axis of the density. Default: 50.
 
     Returns
     -------
@@ -866,25 +1128,36 @@ def plot_mass_error(
         Superimposed density and scatter plots with the values distribution of both axes as marginal histograms.
 
     """
+    x_values = df[x_axis_label].values
+    y_values = df[y_axis_label].values
+    # the density is binned here, only the grid of counts is sent to the browser
+    x_centers, y_centers, counts = alphaviz.preprocessing.get_density_2d(x_values, y_values, bins)
+    n_contours = 5
     fig = go.Figure()
     fig.add_trace(
-        go.Histogram2dContour(
-            x=df[x_axis_label].values,
-            y=df[y_axis_label].values,
+        go.Contour(
+            x=x_centers,
+            y=y_centers,
+            z=counts,
             colorscale='Blues',
-            ncontours=5,
             name=" ",
             contours=dict(
                 showlabels=False,
-                coloring='fill'
+                coloring='fill',
+                start=0,
+                end=counts.max(),
+                size=max(counts.max() / n_contours, 1),
             ),
             hoverinfo='none',
         )
     )
+    if len(x_values) > max_points:
+        selected = np.sort(np.random.default_rng(0).choice(len(x_values), max_points, replace=False))
+        x_values, y_values = x_values[selected], y_values[selected]
     fig.add_trace(
-        go.Scatter(
-            x=df[x_axis_label].values,
-            y=df[y_axis_label].values,
+        go.Scattergl(
+            x=x_values,
+            y=y_values,
             mode='markers',
             marker=dict(
                 color='rgba(0,0,0,0.3)',
@@ -895,35 +1168,7 @@ def plot_mass_error(
             # hoverinfo='none',
         )
     )
-    if mz_tol:
-        fig.add_trace(
-            go.Scatter(
-                x=[df[x_axis_label].values.min(), df[x_axis_label].values.max()],
-                y=[mz_tol, mz_tol],
-                mode='lines',
-                line=dict(
-                    color='darkred',
-                    width=2,
-                    dash='dash'
-                ),
-                showlegend=False,
-                hoverinfo='none',
-            )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=[df[x_axis_label].values.min(), df[x_axis_label].values.max()],
-                y=[-mz_tol, -mz_tol],
-                mode='lines',
-                line=dict(
-                    color='darkred',
-                    width=2,
-                    dash='dash'
-                ),
-                showlegend=False,
-                hoverinfo='none',
-            )
-        )
+    update_mass_error_tolerance(fig, mz_tol)
 
     fig.update_layout(
         autosize=False,
@@ -946,8 +1191,46 @@ def plot_mass_error(
     return fig
 
 
+def update_mass_error_tolerance(
+    fig: go.Figure,
+    mz_tol: float = None
+) -> go.Figure:
+    """Show the m/z tolerance in a mass error plot as two horizontal lines, updating only the layout of the figure.
+
+    Parameters
+    ----------
+    fig : plotly.graph_objects.Figure object
+        The figure created by the plot_mass_error function.
+    mz_tol : float
+        The m/z tolerance (ppm). If not specified, the lines are removed. Default: None.
+
+    Returns
+    -------
+    plotly.graph_objects.Figure object
+        The updated figure.
+
+    """
+    fig.layout.shapes = [
+        dict(
+            type='line',
+            xref='paper',
+            x0=0,
+            x1=1,
+            yref='y',
+            y0=tolerance,
+            y1=tolerance,
+            line=dict(
+                color='darkred',
+                width=2,
+                dash='dash'
+            ),
+        ) for tolerance in ([mz_tol, -mz_tol] if mz_tol else [])
+    ]
+    return fig
+
+
 def plot_peptide_distr(
-    df: pd.DataFrame,
+    df,
     x_axis_label: str,
     plot_title: str
 ) -> go.Figure:
@@ -955,8 +1238,8 @@ def plot_peptide_distr(
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The data frame containing the data.
+    df : pd.DataFrame or dict
+        The data frame containing the data or the statistics of the column precomputed with the alphaviz.preprocessing.get_qc_statistics function.
     x_axis_label : str
         The label of the x-axis.
     plot_title : str
@@ -968,13 +1251,20 @@ def plot_peptide_distr(
         A distribution plot represented as a histogram with a boxplot.
 
     """
+    if isinstance(df, dict):
+        statistics = df
+    else:
+        statistics = alphaviz.preprocessing.get_qc_statistics(df, [x_axis_label])[x_axis_label]
+    bin_edges = statistics['bin_edges']
+
     fig = go.Figure()
 
     fig.add_trace(
-        go.Histogram(
-            x=df[x_axis_label],
+        go.Bar(
+            x=(bin_edges[1:] + bin_edges[:-1]) / 2,
+            y=statistics['counts'],
+            width=np.diff(bin_edges),
             xaxis='x',
-            nbinsy=50,
             marker=dict(
                 color='rgb(198,219,239)'
             ),
@@ -984,7 +1274,14 @@ def plot_peptide_distr(
 
     fig.add_trace(
         go.Box(
-            x=df[x_axis_label],
+            q1=[statistics['q1']],
+            median=[statistics['median']],
+            q3=[statistics['q3']],
+            lowerfence=[statistics['lowerfence']],
+            upperfence=[statistics['upperfence']],
+            mean=[statistics['mean']],
+            y=[''],
+            orientation='h',
             yaxis='y2',
             marker_color='rgb(198,219,239)',
             name='',
@@ -1074,6 +1371,9 @@ def plot_elution_heatmap(
     y_dimension = labels[y_axis_label]
     z_dimension = labels[z_axis_label]
 
+    import holoviews as hv
+    from holoviews.operation.datashader import dynspread, rasterize, shade
+
     df["rt_values"] /= 60
 
     opts_ms1 = dict(
@@ -1111,6 +1411,67 @@ def plot_elution_heatmap(
     return fig
 
 
+def _get_cached_xics(
+    timstof_data,
+    peptide_info: dict,
+    mz_tol: float,
+    rt_tol: float,
+    im_tol: float,
+    xic_cache=None
+) -> dict:
+    fragment_mzs = tuple(peptide_info['fragments'].values())
+    if xic_cache is None:
+        return alphaviz.preprocessing.get_fragment_xics(
+            timstof_data,
+            peptide_info['mz'],
+            fragment_mzs,
+            peptide_info['rt'],
+            peptide_info['im'],
+            mz_tol=mz_tol,
+            rt_tol=rt_tol,
+            im_tol=im_tol,
+        )
+    peptide_key = (
+        getattr(timstof_data, 'bruker_d_folder_name', id(timstof_data)),
+        peptide_info['sequence'],
+        peptide_info.get('charge'),
+        peptide_info['mz'],
+        peptide_info['rt'],
+        peptide_info['im'],
+        fragment_mzs,
+    )
+    tolerances = dict(mz_tol=mz_tol, rt_tol=rt_tol, im_tol=im_tol)
+    xics_key = peptide_key + tuple(tolerances.values())
+    xics = xic_cache.get(xics_key)
+    if xics is None:
+        # the peaks are extracted at least at the envelope tolerances, narrower tolerances are served from memory
+        envelope, peaks = xic_cache.get(('peaks',) + peptide_key, (dict(), None))
+        if peaks is None or any(tolerances[tol] > envelope[tol] for tol in tolerances):
+            envelope = {
+                tol: max(value, envelope.get(tol, XIC_ENVELOPE_TOLERANCES[tol])) for tol, value in tolerances.items()
+            }
+            peaks = alphaviz.preprocessing.extract_peptide_peaks(
+                timstof_data,
+                peptide_info['mz'],
+                fragment_mzs,
+                peptide_info['rt'],
+                peptide_info['im'],
+                **envelope
+            )
+            xic_cache.put(('peaks',) + peptide_key, (envelope, peaks))
+        xics = alphaviz.preprocessing.get_xics_from_peaks(
+            timstof_data,
+            peaks,
+            peptide_info['mz'],
+            fragment_mzs,
+            peptide_info['rt'],
+            peptide_info['im'],
+            **tolerances
+        )
+        xic_cache.put(xics_key, xics)
+    return xics
+
+
 def plot_elution_profile_heatmap(
     timstof_data,
     peptide_info: dict,
@@ -1119,6 +1480,7 @@ def plot_elution_profile_heatmap(
     mz_tol: int = 50,
     rt_tol: int = 30,
     im_tol: int = 0.05,
+    xic_cache=None,
     title: str = "",
     n_cols: int = 5,
     # width: int = 180,
@@ -1144,6 +1506,8 @@ def plot_elution_profile_heatmap(
         The rt tolerance value. Default: 30 ppm.
     im_tol: float
         The im tolerance value. Default: 0.05 ppm.
+    xic_cache : alphaviz.utils.LRUCache
+        The cache of the extracted XICs shared with plot_elution_profile. Default: None (no caching).
     title : str
         The title of the plot. Default: "".
     n_cols: int
@@ -1160,31 +1524,19 @@ def plot_elution_profile_heatmap(
         for the specified peptide and all his fragments.
     """
     if calculate_fragment_masses:
-        # predict the theoretical fragments using the Alphapept get_fragmass() function.
-        frag_masses, frag_type = alphaviz.utils.get_fragmass(
-            parsed_pep=alphaviz.utils.parse(peptide_info['sequence']),
-            mass_dict=mass_dict
-        )
+        # predict the theoretical singly charged b- and y-ions, cached per peptide sequence.
+        fragments = alphaviz.utils.get_peptide_fragments(peptide_info['sequence'], mass_dict)
         peptide_info['fragments'] = {
-            (f"b{key}" if key > 0 else f"y{-key}"): value for key, value in zip(frag_type, frag_masses)
+            f"{'by'[frag_type]}{frag_number}": frag_mz for frag_type, frag_number, frag_mz in zip(
+                fragments['type'].tolist(), fragments['number'].tolist(), fragments['mz'].tolist()
+            )
         }
 
-    # slice the data using the rt_tol, im_tol and mz_tol values
-    rt_slice = slice(peptide_info['rt'] - rt_tol, peptide_info['rt'] + rt_tol)
-    im_slice = slice(peptide_info['im'] - im_tol, peptide_info['im'] + im_tol)
-    prec_mz_slice = slice(peptide_info['mz'] / (1 + mz_tol / 10**6), peptide_info['mz'] * (1 + mz_tol / 10**6))
-
-    # create an elution profile for the precursor
-    precursor_indices = timstof_data[
-        rt_slice,
-        im_slice,
-        0,
-        prec_mz_slice,
-        'raw'
-    ]
+    # extract the precursor and all fragments at once
+    xics = _get_cached_xics(timstof_data, peptide_info, mz_tol, rt_tol, im_tol, xic_cache)
 
     common_plot = plot_elution_heatmap(
-        timstof_data.as_dataframe(precursor_indices),
+        timstof_data.as_dataframe(xics['precursor_indices']),
         title="precursor",
         # width=width,
         height=height,
@@ -1197,14 +1549,7 @@ def plot_elution_profile_heatmap(
     )
 
     # create elution profiles for all fragments
-    for frag, frag_mz in peptide_info['fragments'].items():
-        fragment_data_indices = timstof_data[
-            rt_slice,
-            im_slice,
-            prec_mz_slice,
-            slice(frag_mz / (1 + mz_tol / 10**6), frag_mz * (1 + mz_tol / 10**6)),
-            'raw'
-        ]
+    for (frag, frag_mz), fragment_data_indices in zip(peptide_info['fragments'].items(), xics['fragment_indices']):
         if len(fragment_data_indices) > 0:
             common_plot += plot_elution_heatmap(
                 timstof_data.as_dataframe(fragment_data_indices),
@@ -1252,41 +1597,35 @@ def plot_elution_line(
     a Plotly line plot
         The XIC line plot.
     """
-    axis_dict = {
-        "rt": "RT, min",
-        "intensity": "Intensity",
-    }
-    x_axis_label = axis_dict["rt"]
-    # y_axis_label = axis_dict["intensity"]
-    labels = {
-        'RT, min': "rt_values",
-    }
-    x_dimension = labels[x_axis_label]
-    intensities = timstof_data.bin_intensities(selected_indices, [x_dimension])
-    x_ticks = timstof_data.rt_values / 60
+    x_ticks, intensities = alphaviz.preprocessing.get_rt_profile(
+        timstof_data,
+        selected_indices,
+        remove_zeros=remove_zeros,
+        trim=trim
+    )
+    return _plot_xic_trace(x_ticks / 60, intensities, label, marker_color)
 
-    non_zeros = np.flatnonzero(intensities)
-    if len(non_zeros) == 0:
-        x_ticks = np.empty(0, dtype=x_ticks.dtype)
-        intensities = np.empty(0, dtype=intensities.dtype)
-    else:
-        if remove_zeros:
-            x_ticks = x_ticks[non_zeros]
-            intensities = intensities[non_zeros]
-        elif trim:
-            start = max(0, non_zeros[0] - 1)
-            end = non_zeros[-1] + 2
-            x_ticks = x_ticks[start: end]
-            intensities = intensities[start: end]
 
+def _plot_xic_trace(
+    x_ticks: np.ndarray,
+    intensities: np.ndarray,
+    label: str,
+    marker_color: dict,
+    remove_zeros: bool = False,
+    meta: int = None
+) -> go.Scatter:
+    x_axis_label = "RT, min"
+    if remove_zeros:
+        non_zeros = np.flatnonzero(intensities)
+        x_ticks, intensities = x_ticks[non_zeros], intensities[non_zeros]
     trace = go.Scatter(
         x=x_ticks,
         y=intensities,
         mode='lines',
-        text=[f'{x_axis_label}'.format(i + 1) for i in range(len(x_ticks))],
-        hovertemplate='<b>%{text}:</b> %{x};<br><b>Intensity:</b> %{y}.',
+        hovertemplate=f'<b>{x_axis_label}:</b> %{{x}};<br><b>Intensity:</b> %{{y}}.',
         name=label,
         marker=marker_color,
+        meta=meta,
     )
     return trace
 
@@ -1301,6 +1640,7 @@ def plot_elution_profile(
     mz_tol: float = 50,
     rt_tol: float = 30,
     im_tol: float = 0.05,
+    xic_cache=None,
     title: str = "",
     # width: int = 900,
     height: int = 400,
@@ -1327,6 +1667,8 @@ def plot_elution_profile(
         The rt tolerance value. Default: 30 ppm.
     im_tol: float
         The im tolerance value. Default: 0.05 ppm.
+    xic_cache : alphaviz.utils.LRUCache
+        The cache of the extracted XICs shared with plot_elution_profile_heatmap. Default: None (no caching).
     title : str
         The title of the plot.
     # width : int
@@ -1345,63 +1687,44 @@ def plot_elution_profile(
     y_axis_label = "intensity"
 
     if calculate_fragment_masses:
-        # predict the theoretical fragments using the Alphapept get_fragmass() function.
-        frag_masses, frag_type = alphaviz.utils.get_fragmass(
-            parsed_pep=alphaviz.utils.parse(peptide_info['sequence']),
-            mass_dict=mass_dict
-        )
+        # predict the theoretical singly charged b- and y-ions, cached per peptide sequence.
+        fragments = alphaviz.utils.get_peptide_fragments(peptide_info['sequence'], mass_dict)
         peptide_info['fragments'] = {
-            (f"b{key}" if key > 0 else f"y{-key}"): value for key, value in zip(frag_type, frag_masses)
+            f"{'by'[frag_type]}{frag_number}": frag_mz for frag_type, frag_number, frag_mz in zip(
+                fragments['type'].tolist(), fragments['number'].tolist(), fragments['mz'].tolist()
+            )
         }
 
-    # slice the data using the rt_tol, im_tol and mz_tol values
-    rt_slice = slice(peptide_info['rt'] - rt_tol, peptide_info['rt'] + rt_tol)
-    im_slice = slice(peptide_info['im'] - im_tol, peptide_info['im'] + im_tol)
-    prec_mz_slice = slice(peptide_info['mz'] / (1 + mz_tol / 10**6), peptide_info['mz'] * (1 + mz_tol / 10**6))
-
-    if len(peptide_info['fragments'].values()) + 1 <= len(getattr(px.colors.qualitative, colorscale_qualitative)):
-        colors_set = getattr(px.colors.qualitative, colorscale_qualitative)
-    else:
-        colors_set = px.colors.sample_colorscale(colorscale_sequential, samplepoints=len(peptide_info['fragments'].values()) + 1)
-
-    # create an elution profile for the precursor
-    precursor_indices = raw_data[
-        rt_slice,
-        im_slice,
-        0,
-        prec_mz_slice,
-        'raw'
-    ]
+    # extract the elution profiles of the precursor and all fragments at once
+    xics = _get_cached_xics(raw_data, peptide_info, mz_tol, rt_tol, im_tol, xic_cache)
+    x_ticks = xics['rt_values'] / 60
     fig = go.Figure()
     fig.add_trace(
-        plot_elution_line(
-            raw_data,
-            precursor_indices,
+        _plot_xic_trace(
+            x_ticks,
+            xics['intensities'][0],
             remove_zeros=True,
             # label=f"precursor ({round(peptide_info['mz'], 3)})",
             label='precursor',
-            marker_color=dict(color=colors_set[0])
+            marker_color=dict(),
+            meta=0
         )
     )
-    # create elution profiles for all fragments
     for ind, (frag, frag_mz) in enumerate(peptide_info['fragments'].items()):
-        fragment_data_indices = raw_data[
-            rt_slice,
-            im_slice,
-            prec_mz_slice,
-            slice(frag_mz / (1 + mz_tol / 10**6), frag_mz * (1 + mz_tol / 10**6)),
-            'raw'
-        ]
-        if len(fragment_data_indices) > 0:
+        if len(xics['fragment_indices'][ind]) > 0:
             fig.add_trace(
-                plot_elution_line(
-                    raw_data,
-                    fragment_data_indices,
+                _plot_xic_trace(
+                    x_ticks,
+                    xics['intensities'][ind + 1],
                     remove_zeros=True,
                     label=f"{frag} ({round(frag_mz, 3)})",
-                    marker_color=dict(color=colors_set[ind+1])
+                    marker_color=dict(),
+                    meta=ind + 1
                 )
             )
+    # the colors follow the fragments, also those without any signal, so that they do not change between peptides
+    fig.update_layout(meta=dict(n_colors=len(peptide_info['fragments']) + 1))
+    restyle_traces(fig, colorscale_qualitative, colorscale_sequential)
 
     fig.update_layout(
         title=dict(
@@ -1444,7 +1767,7 @@ def plot_elution_profile(
 
 
 def plot_pept_per_protein_barplot(
-    df: pd.DataFrame,
+    df,
     x_axis_label: str,
     plot_title: str
 ) -> go.Figure:
@@ -1452,8 +1775,8 @@ def plot_pept_per_protein_barplot(
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The data frame containing the data.
+    df : pd.DataFrame or dict
+        The data frame containing the data or the statistics of the column precomputed with the alphaviz.preprocessing.get_qc_statistics function with the column in count_columns.
     x_axis_label : str
         The label of the x-axis containing information about the number of identified peptides per protein.
     plot_title : str
@@ -1465,19 +1788,25 @@ def plot_pept_per_protein_barplot(
         A distribution barplot.
 
     """
-    df = df.copy()
-    df['pept_per_prot'] = df[x_axis_label].apply(lambda x: str(x) if x < 5 else '>5')
+    if isinstance(df, dict):
+        statistics = df
+    else:
+        statistics = alphaviz.preprocessing.get_qc_statistics(df, [x_axis_label], count_columns=[x_axis_label])[x_axis_label]
+    pept_per_prot = pd.Series(
+        statistics['value_counts'],
+        index=[str(value) if value < 5 else '>5' for value in statistics['values']]
+    ).groupby(level=0).sum().sort_index()
 
     fig = go.Figure()
 
     fig.add_trace(
         go.Bar(
-            x=df.pept_per_prot.value_counts().sort_index().index,
-            y=df.pept_per_prot.value_counts().sort_index().values,
+            x=pept_per_prot.index,
+            y=pept_per_prot.values,
             marker=dict(
                 color='rgb(198,219,239)'
             ),
-            text=[f'{each:.2f}' for each in df.pept_per_prot.value_counts(normalize=True).sort_index().values],
+            text=[f'{each:.2f}' for each in pept_per_prot.values / pept_per_prot.values.sum()],
             textfont={
                 'size': 8,
                 'color': 'green'
@@ -1514,6 +1843,9 @@ def plot_pept_per_protein_barplot(
 
 
 def export_svg(obj, filename='test', width=500, height=500):
+    import holoviews as hv
+    from bokeh.io import export_svgs
+
     plot_state = hv.renderer('bokeh').get_plot(obj).state
     plot_state.output_backend = 'svg'
     export_svgs(plot_state, filename=filename, width=width, height=height)
@@ -5,6 +5,8 @@ This module provides functions that are helping to preprocess the data.
 
 import re
 import logging
+import warnings
+import numpy as np
 import pandas as pd
 
 
@@ -140,6 +142,341 @@ def get_aa_seq(
         logging.info(f"The provided protein ID {id} is missing in the fasta file.")
 
 
+def get_protein_sequences(
+    fasta,  # pyteomics.fasta.IndexedUniProt object
+) -> dict:
+    """Extract the sequences of all proteins from the pyteomics.fasta.IndexedUniProt object.
+
+    Parameters
+    ----------
+    fasta : pyteomics.fasta.IndexedUniProt object
+        The pyteomics.fasta.IndexedUniProt object.
+
+    Returns
+    -------
+    dict
+        A dictionary with the protein IDs as keys and the protein sequences as values.
+
+    """
+    return {
+        protein.description['id']: protein.sequence for protein in fasta
+    }
+
+
+def strip_peptide_modifications(
+    peptide: str,
+    regex: str = r"\[(.*?)\]|\((.*?)\)\)?"
+) -> str:
+    """Remove the modifications in the MaxQuant, DIA-NN or AlphaPept style from the peptide sequence.
+
+    Parameters
+    ----------
+    peptide : str
+        The modified peptide sequence, e.g. '_AAM(ox)K_', 'AAM[Oxidation (M)]K' or 'AAoxMK'.
+    regex : str
+        A regular expression matching the modifications in brackets. Default: r"\\[(.*?)\\]|\\((.*?)\\)\\)?".
+
+    Returns
+    -------
+    str
+        The naked peptide sequence, e.g. 'AAMK'.
+
+    """
+    peptide = re.sub(regex, "", peptide.replace('_', ''))
+    return re.sub('[^A-Z]', "", peptide)
+
+
+def _encode_sequence(
+    sequence: str
+) -> np.ndarray:
+    # A..Z are encoded as 1..26, all other characters (incl. the separator '@') as 0
+    codes = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8).astype(np.int64) - 64
+    codes[(codes < 1) | (codes > 26)] = 0
+    return codes
+
+
+def _pack_kmers(
+    codes: np.ndarray,
+    k: int
+) -> np.ndarray:
+    # every residue takes 5 bits, so k <= 12 fits into an int64
+    n_kmers = max(len(codes) - k + 1, 0)
+    kmers = np.zeros(n_kmers, dtype=np.int64)
+    for i in range(k):
+        kmers |= codes[i: i + n_kmers] << (5 * (k - 1 - i))
+    return kmers
+
+
+def map_peptides_to_proteins(
+    peptides: list,
+    protein_sequences: dict,
+    regex: str = r"\[(.*?)\]|\((.*?)\)\)?",
+    max_seed_length: int = 12
+) -> pd.DataFrame:
+    """Find the positions of all peptides in all protein sequences in one pass over the concatenated proteome.
+
+    All proteins are concatenated into one sequence and every position of it is encoded as a k-mer, k being the length of the shortest peptide (at most max_seed_length). The k-mers are matched against the peptide prefixes with a sorted-array lookup and the candidate positions are verified against the full peptide sequences. Isoleucine and leucine are treated as identical, all occurrences of a peptide in a protein are reported.
+
+    Parameters
+    ----------
+    peptides : list
+        A list of (modified) peptide sequences identified in the run.
+    protein_sequences : dict
+        A dictionary with the protein IDs as keys and the protein sequences as values, e.g. obtained with the get_protein_sequences function.
+    regex : str
+        A regular expression to remove the modifications from the peptide sequences. Default: r"\\[(.*?)\\]|\\((.*?)\\)\\)?".
+    max_seed_length : int
+        The maximal length of the k-mers used to find the candidate positions. Should not be larger than 12. Default: 12.
+
+    Returns
+    -------
+    pd.DataFrame
+        The data frame sorted by protein ID and position contains the following columns:
+            - 'protein_id',
+            - 'peptide': the peptide as specified in the input list,
+            - 'start': the 0-based start position of the peptide in the protein sequence,
+            - 'end': the 0-based position after the last amino acid of the peptide.
+
+    """
+    columns = ['protein_id', 'peptide', 'start', 'end']
+    naked_peptides = pd.DataFrame({'peptide': pd.unique(pd.Series(peptides, dtype=object))})
+    naked_peptides['sequence'] = naked_peptides.peptide.apply(
+        lambda x: strip_peptide_modifications(x, regex).replace('I', 'L')
+    )
+    naked_peptides = naked_peptides[naked_peptides.sequence.str.len() > 0]
+    if naked_peptides.empty or not protein_sequences:
+        return pd.DataFrame(columns=columns)
+    unique_sequences = naked_peptides.sequence.unique().tolist()
+
+    protein_ids = np.array(list(protein_sequences.keys()), dtype=object)
+    proteome = '@'.join(protein_sequences.values()).upper().replace('I', 'L') + '@'
+    protein_starts = np.cumsum(
+        [0] + [len(seq) + 1 for seq in protein_sequences.values()]
+    )[:-1]
+
+    seed_length = min(max_seed_length, min(len(seq) for seq in unique_sequences))
+    proteome_kmers = _pack_kmers(_encode_sequence(proteome), seed_length)
+    peptide_starts = np.cumsum(
+        [0] + [len(seq) + 1 for seq in unique_sequences]
+    )[:-1]
+    peptide_seeds = _pack_kmers(
+        _encode_sequence('@'.join(unique_sequences)),
+        seed_length
+    )[peptide_starts]
+    seed_order = np.argsort(peptide_seeds, kind='stable')
+    sorted_seeds = peptide_seeds[seed_order]
+
+    first_seeds = np.searchsorted(sorted_seeds, proteome_kmers, 'left')
+    candidates = np.flatnonzero(
+        sorted_seeds[np.minimum(first_seeds, len(sorted_seeds) - 1)] == proteome_kmers
+    )
+    first_seeds = first_seeds[candidates]
+    last_seeds = np.searchsorted(sorted_seeds, proteome_kmers[candidates], 'right')
+
+    hit_positions = []
+    hit_sequences = []
+    for position, first, last in zip(candidates, first_seeds, last_seeds):
+        for seed_index in seed_order[first: last]:
+            sequence = unique_sequences[seed_index]
+            if proteome.startswith(sequence, position):
+                hit_positions.append(position)
+                hit_sequences.append(sequence)
+    if not hit_positions:
+        return pd.DataFrame(columns=columns)
+
+    hit_positions = np.array(hit_positions, dtype=np.int64)
+    protein_indices = np.searchsorted(protein_starts, hit_positions, 'right') - 1
+    hits = pd.DataFrame({
+        'protein_id': protein_ids[protein_indices],
+        'sequence': hit_sequences,
+        'start': hit_positions - protein_starts[protein_indices],
+    })
+    hits['end'] = hits.start + hits.sequence.str.len()
+    peptide_mapping = pd.merge(naked_peptides, hits, on='sequence')
+    peptide_mapping.sort_values(['protein_id', 'start', 'peptide'], inplace=True)
+    return peptide_mapping[columns].reset_index(drop=True)
+
+
+def get_sequence_coverage(
+    peptide_mapping: pd.DataFrame,
+    protein_id: str,
+    sequence_length: int
+) -> np.ndarray:
+    """Get the residues of the protein covered by the mapped peptides.
+
+    Parameters
+    ----------
+    peptide_mapping : pd.DataFrame
+        The data frame obtained with the map_peptides_to_proteins function.
+    protein_id : str
+        The protein ID.
+    sequence_length : int
+        The length of the protein sequence.
+
+    Returns
+    -------
+    np.ndarray
+        A boolean array of the protein sequence length with True for the covered residues.
+
+    """
+    first, last = peptide_mapping.protein_id.searchsorted(protein_id, 'left'), \
+        peptide_mapping.protein_id.searchsorted(protein_id, 'right')
+    return get_interval_coverage(
+        peptide_mapping.start.values[first: last],
+        peptide_mapping.end.values[first: last],
+        sequence_length
+    )
+
+
+def get_interval_coverage(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    length: int
+) -> np.ndarray:
+    """Get the positions covered by at least one of the half-open intervals.
+
+    Parameters
+    ----------
+    starts : np.ndarray
+        The (0-based) start of each interval.
+    ends : np.ndarray
+        The end (exclusive) of each interval.
+    length : int
+        The length of the covered axis, e.g. of the protein sequence.
+
+    Returns
+    -------
+    np.ndarray
+        A boolean array of the given length with True for the covered positions.
+
+    """
+    coverage = np.zeros(length + 1, dtype=np.int64)
+    np.add.at(coverage, np.asarray(starts, dtype=np.int64), 1)
+    np.add.at(coverage, np.asarray(ends, dtype=np.int64), -1)
+    return np.cumsum(coverage[:-1]) > 0
+
+
+def pack_intervals(
+    starts: np.ndarray,
+    ends: np.ndarray
+) -> np.ndarray:
+    """Stack the half-open intervals into lanes so that the intervals of a lane do not overlap. Each interval, in order of the start, is put into the lowest free lane.
+
+    Parameters
+    ----------
+    starts : np.ndarray
+        The start of each interval.
+    ends : np.ndarray
+        The end (exclusive) of each interval.
+
+    Returns
+    -------
+    np.ndarray
+        The lane of each interval, starting from 0.
+
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    lanes = np.empty(len(starts), dtype=np.int64)
+    lane_ends = np.empty(0, dtype=np.int64)
+    for index in np.argsort(starts, kind='stable'):
+        free_lanes = np.flatnonzero(lane_ends <= starts[index])
+        if len(free_lanes):
+            lane = free_lanes[0]
+        else:
+            lane = len(lane_ends)
+            lane_ends = np.append(lane_ends, 0)
+        lane_ends[lane] = ends[index]
+        lanes[index] = lane
+    return lanes
+
+
+def get_leading_protein_id(
+    protein_ids: str
+) -> str:
+    """Extract the ID of the leading protein from the protein IDs of the protein group.
+
+    Parameters
+    ----------
+    protein_ids : str
+        The protein IDs of the protein group separated by ';' or ',', e.g. 'Q15149;Q15149-7' or 'sp|Q15149|PLEC_HUMAN'.
+
+    Returns
+    -------
+    str
+        The ID of the first protein in the group, e.g. 'Q15149'.
+
+    """
+    protein_id = re.split('[;,]', protein_ids)[0].strip()
+    if '|' in protein_id:
+        protein_id = protein_id.split('|')[1]
+    return protein_id.replace('CON__', '')
+
+
+def get_protein_groups_coverage(
+    protein_ids: pd.Series,
+    peptide_mapping: pd.DataFrame,
+    protein_sequences: dict
+) -> tuple:
+    """Calculate the sequence coverage of the leading proteins of all protein groups at once.
+
+    The peptide intervals of all proteins are placed on one concatenated axis and their union is computed with a single cumulative sum.
+
+    Parameters
+    ----------
+    protein_ids : pd.Series
+        The 'Protein IDs' column of the proteins table.
+    peptide_mapping : pd.DataFrame
+        The data frame obtained with the map_peptides_to_proteins function for the naked peptide sequences.
+    protein_sequences : dict
+        A dictionary with the protein IDs as keys and the protein sequences as values.
+
+    Returns
+    -------
+    a tuple of pd.DataFrame and dict
+        The data frame with the same index as protein_ids contains the 'Seq coverage, %' and the '# unique peptides' columns. The dictionary contains the bitmaps of the covered residues (np.packbits of a boolean array) for each leading protein ID.
+
+    """
+    leading_ids = protein_ids.apply(get_leading_protein_id)
+    unique_ids = [
+        protein_id for protein_id in leading_ids.unique() if protein_id in protein_sequences
+    ]
+    lengths = np.array([len(protein_sequences[protein_id]) for protein_id in unique_ids], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    protein_offsets = pd.Series(offsets[:-1], index=unique_ids, dtype=np.int64)
+
+    mapping = peptide_mapping[peptide_mapping.protein_id.isin(unique_ids)]
+    shifts = protein_offsets.loc[mapping.protein_id.values].values
+    intervals = np.zeros(offsets[-1] + 1, dtype=np.int64)
+    np.add.at(intervals, mapping.start.values.astype(np.int64) + shifts, 1)
+    np.add.at(intervals, mapping.end.values.astype(np.int64) + shifts, -1)
+    covered = np.cumsum(intervals[:-1]) > 0
+
+    covered_counts = np.bincount(
+        np.repeat(np.arange(len(unique_ids)), lengths),
+        weights=covered,
+        minlength=len(unique_ids)
+    ).astype(np.int64)
+    coverage = pd.Series(
+        np.round(covered_counts / np.maximum(lengths, 1) * 100, 2),
+        index=unique_ids
+    )
+    unique_peptides = mapping.groupby('protein_id').peptide.nunique()
+    bitmaps = {
+        protein_id: np.packbits(covered[start: end]) for protein_id, start, end in zip(
+            unique_ids, offsets[:-1], offsets[1:]
+        )
+    }
+    result = pd.DataFrame(
+        {
+            'Seq coverage, %': leading_ids.map(coverage).values,
+            '# unique peptides': leading_ids.map(unique_peptides).fillna(0).astype(int).values,
+        },
+        index=protein_ids.index
+    )
+    return result, bitmaps
+
+
 def get_mq_ms2_scan_data(
     msms: pd.DataFrame,
     selected_msms_scan: int,
@@ -200,6 +537,787 @@ def get_mq_ms2_scan_data(
     return data_merged.drop('mz', axis=1)
 
 
+def _create_lookup(
+    keys: np.ndarray,
+    values: np.ndarray,
+    fill_value
+) -> np.ndarray:
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values)
+    lookup = np.full(
+        keys.max() + 1 if len(keys) else 0,
+        fill_value,
+        dtype=np.result_type(values.dtype, np.min_scalar_type(fill_value))
+    )
+    lookup[keys] = values
+    return lookup
+
+
+def get_frame_topology(
+    raw_data,  # AlphaTims TimsTOF object
+    frame_shift: int = 0
+) -> dict:
+    """Precompute the relationships between the frames, the PASEF/DIA fragment frames and the precursors of the raw file as numpy lookup arrays.
+
+    Parameters
+    ----------
+    raw_data : AlphaTims TimsTOF object
+        AlphaTims TimsTOF object.
+    frame_shift : int
+        The value subtracted from the fragment frame IDs, e.g. 1 for the .hdf files to fix the difference in the raw_data.fragment_frames table for .d and .hdf files. Default: 0.
+
+    Returns
+    -------
+    dict
+        A dictionary with the following lookup arrays (-1 / np.nan for the missing values):
+            - 'fragment_frame': PASEF/DIA fragment ID -> MS2 frame,
+            - 'fragment_precursor': PASEF fragment ID -> precursor ID,
+            - 'precursor_parent': precursor ID -> parent MS1 frame,
+            - 'precursor_mono_mz': precursor ID -> monoisotopic m/z,
+            - 'previous_ms1_frame': frame ID -> the closest preceding MS1 frame.
+
+    """
+    fragment_frames = raw_data.fragment_frames
+    frames = raw_data.frames
+    precursors = getattr(raw_data, 'precursors', None)
+    topology = dict()
+    topology['fragment_frame'] = _create_lookup(
+        fragment_frames.index.values,
+        fragment_frames.Frame.values.astype(np.int64) - frame_shift,
+        -1
+    )
+    if precursors is not None and 'Precursor' in fragment_frames.columns:
+        topology['fragment_precursor'] = _create_lookup(
+            fragment_frames.index.values,
+            fragment_frames.Precursor.values.astype(np.int64),
+            -1
+        )
+        topology['precursor_parent'] = _create_lookup(
+            precursors.Id.values,
+            precursors.Parent.values.astype(np.int64),
+            -1
+        )
+        topology['precursor_mono_mz'] = _create_lookup(
+            precursors.Id.values,
+            precursors.MonoisotopicMz.values.astype(np.float64),
+            np.nan
+        )
+    else:
+        topology['fragment_precursor'] = np.full(len(topology['fragment_frame']), -1, dtype=np.int64)
+        topology['precursor_parent'] = np.empty(0, dtype=np.int64)
+        topology['precursor_mono_mz'] = np.empty(0, dtype=np.float64)
+
+    ms1_frames = np.sort(frames.Id.values[frames.MsMsType.values == 0]).astype(np.int64)
+    previous_ms1_index = np.searchsorted(
+        ms1_frames,
+        np.arange(frames.Id.values.max() + 2),
+        'left'
+    ) - 1
+    topology['previous_ms1_frame'] = np.where(
+        previous_ms1_index >= 0,
+        ms1_frames[np.maximum(previous_ms1_index, 0)] if len(ms1_frames) else -1,
+        -1
+    )
+    return topology
+
+
+def get_fragment_frame(
+    topology: dict,
+    fragment_id: int
+) -> int:
+    """Get the MS2 frame of the PASEF/DIA fragment ID from the frame topology.
+
+    Parameters
+    ----------
+    topology : dict
+        The dictionary obtained with the get_frame_topology function.
+    fragment_id : int
+        The PASEF/DIA fragment ID, e.g. the 'MS/MS scan number'.
+
+    Returns
+    -------
+    int
+        The MS2 frame.
+
+    Raises
+    ------
+    ValueError
+        If the fragment ID is unknown.
+
+    """
+    if 0 <= fragment_id < len(topology['fragment_frame']) and topology['fragment_frame'][fragment_id] != -1:
+        return int(topology['fragment_frame'][fragment_id])
+    raise ValueError(f"The fragment ID {fragment_id} is not found in the raw file.")
+
+
+def get_previous_ms1_frame(
+    topology: dict,
+    frame: int
+) -> int:
+    """Get the closest MS1 frame preceding the specified frame from the frame topology.
+
+    Parameters
+    ----------
+    topology : dict
+        The dictionary obtained with the get_frame_topology function.
+    frame : int
+        The frame ID.
+
+    Returns
+    -------
+    int
+        The MS1 frame.
+
+    Raises
+    ------
+    ValueError
+        If the frame is unknown or there is no preceding MS1 frame.
+
+    """
+    if 0 <= frame < len(topology['previous_ms1_frame']) and topology['previous_ms1_frame'][frame] != -1:
+        return int(topology['previous_ms1_frame'][frame])
+    raise ValueError(f"No MS1 frame precedes the frame {frame}.")
+
+
+def get_pasef_frames(
+    topology: dict,
+    pasef_ids: list
+) -> pd.DataFrame:
+    """Get the MS2 frames, precursors and their parent MS1 frames for the PASEF IDs from the frame topology.
+
+    Parameters
+    ----------
+    topology : dict
+        The dictionary obtained with the get_frame_topology function.
+    pasef_ids : list
+        A list of PASEF MS/MS IDs.
+
+    Returns
+    -------
+    pd.DataFrame
+        The data frame contains the 'Frame', 'Precursor', 'Parent' and 'MonoisotopicMz' columns for the PASEF IDs having a known precursor.
+
+    """
+    pasef_ids = np.sort(np.asarray(pasef_ids, dtype=np.int64))
+    pasef_ids = pasef_ids[(pasef_ids >= 0) & (pasef_ids < len(topology['fragment_frame']))]
+    precursor_ids = topology['fragment_precursor'][pasef_ids]
+    is_known = (precursor_ids >= 0) & (precursor_ids < len(topology['precursor_parent']))
+    is_known[is_known] = topology['precursor_parent'][precursor_ids[is_known]] >= 0
+    pasef_ids, precursor_ids = pasef_ids[is_known], precursor_ids[is_known]
+    return pd.DataFrame({
+        'Frame': topology['fragment_frame'][pasef_ids],
+        'Precursor': precursor_ids,
+        'Parent': topology['precursor_parent'][precursor_ids],
+        'MonoisotopicMz': topology['precursor_mono_mz'][precursor_ids],
+    })
+
+
+def get_rt_profile(
+    timstof_data,  # alphatims.bruker.TimsTOF object
+    selected_indices: np.ndarray,
+    remove_zeros: bool = False,
+    trim: bool = True
+) -> tuple:
+    """Sum the intensities of the selected raw indices per frame, allocating only the frames between the first and the last selected one.
+
+    Parameters
+    ----------
+    timstof_data : alphatims.bruker.TimsTOF
+        An alphatims.bruker.TimsTOF data object.
+    selected_indices : np.ndarray
+        The raw indices that are selected for this XIC.
+    remove_zeros : bool
+        If True, the frames without signal are removed. Default: False.
+    trim : bool
+        If True, the frames without signal on the left and right are trimmed, keeping one frame on each side. If False (and remove_zeros is False), the XIC covers the whole run. Default: True.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The retention time values (in sec) and the summed intensities of the XIC. Both are empty if no index is selected.
+    """
+    return get_line_profile(
+        timstof_data,
+        selected_indices,
+        'rt_values',
+        remove_zeros=remove_zeros,
+        trim=trim
+    )
+
+
+PEAK_DTYPE = np.dtype([
+    ('raw_index', np.int64),
+    ('frame', np.int64),
+    ('scan', np.int64),
+    ('rt', np.float64),
+    ('im', np.float64),
+    ('mz', np.float64),
+    ('intensity', np.float64),
+    ('quad_low', np.float64),
+    ('quad_high', np.float64),
+    ('fragment', np.int32),
+])
+
+
+def extract_peptide_peaks(
+    timstof_data,  # alphatims.bruker.TimsTOF object
+    precursor_mz: float,
+    fragment_mzs: np.ndarray,
+    rt: float,
+    im: float,
+    mz_tol: float = 50,
+    rt_tol: float = 30,
+    im_tol: float = 0.05
+) -> np.ndarray:
+    """Extract all precursor and fragment peaks of a peptide within the tolerances into a compact structured array.
+
+    The raw data are sliced twice: once for the precursor (MS1) and once for the m/z range of all fragments. Extracting at the widest tolerance allows serving any narrower tolerance with get_xics_from_peaks without touching the raw data again.
+
+    Parameters
+    ----------
+    timstof_data : alphatims.bruker.TimsTOF
+        An alphatims.bruker.TimsTOF data object.
+    precursor_mz : float
+        The precursor m/z value.
+    fragment_mzs : np.ndarray
+        The m/z values of the fragments.
+    rt : float
+        The retention time (in sec) of the precursor.
+    im : float
+        The ion mobility of the precursor.
+    mz_tol: float
+        The mz tolerance value. Default: 50 ppm.
+    rt_tol: float
+        The rt tolerance value. Default: 30 sec.
+    im_tol: float
+        The im tolerance value. Default: 0.05.
+
+    Returns
+    -------
+    np.ndarray
+        A structured array with the PEAK_DTYPE fields: the raw index, frame, scan, rt (in sec), im, m/z, intensity, quadrupole bounds (-1 for MS1) and the closest fragment (-1 for the precursor peaks) of each peak. The precursor peaks go first, then the fragment peaks sorted by m/z.
+    """
+    fragment_mzs = np.asarray(fragment_mzs, dtype=np.float64)
+    mz_factor = 1 + mz_tol / 10**6
+    rt_slice = slice(rt - rt_tol, rt + rt_tol)
+    im_slice = slice(im - im_tol, im + im_tol)
+    prec_mz_slice = slice(precursor_mz / mz_factor, precursor_mz * mz_factor)
+    precursor_indices = timstof_data[
+        rt_slice,
+        im_slice,
+        0,
+        prec_mz_slice,
+        'raw'
+    ]
+    if len(fragment_mzs) > 0:
+        fragment_window_indices = timstof_data[
+            rt_slice,
+            im_slice,
+            prec_mz_slice,
+            slice(fragment_mzs.min() / mz_factor, fragment_mzs.max() * mz_factor),
+            'raw'
+        ]
+        fragment_window_indices = fragment_window_indices[
+            np.argsort(
+                timstof_data.mz_values[timstof_data.tof_indices[fragment_window_indices]],
+                kind='stable'
+            )
+        ]
+    else:
+        fragment_window_indices = np.empty(0, dtype=np.int64)
+    raw_indices = np.concatenate([precursor_indices, fragment_window_indices]).astype(np.int64)
+
+    peaks = np.empty(len(raw_indices), dtype=PEAK_DTYPE)
+    push_indices = np.searchsorted(timstof_data.push_indptr, raw_indices, 'right') - 1
+    quad_indices = np.searchsorted(timstof_data.quad_indptr, push_indices, 'right') - 1
+    peaks['raw_index'] = raw_indices
+    peaks['frame'] = push_indices // timstof_data.scan_max_index
+    peaks['scan'] = push_indices % timstof_data.scan_max_index
+    peaks['rt'] = timstof_data.rt_values[peaks['frame']]
+    peaks['im'] = timstof_data.mobility_values[peaks['scan']]
+    peaks['mz'] = timstof_data.mz_values[timstof_data.tof_indices[raw_indices]]
+    peaks['intensity'] = timstof_data.intensity_values[raw_indices]
+    peaks['quad_low'] = timstof_data.quad_mz_values[quad_indices, 0]
+    peaks['quad_high'] = timstof_data.quad_mz_values[quad_indices, 1]
+    peaks['fragment'] = -1
+    if len(fragment_window_indices) > 0:
+        order = np.argsort(fragment_mzs)
+        midpoints = (fragment_mzs[order][1:] + fragment_mzs[order][:-1]) / 2
+        peaks['fragment'][len(precursor_indices):] = order[
+            np.searchsorted(midpoints, peaks['mz'][len(precursor_indices):])
+        ]
+    return peaks
+
+
+def get_xics_from_peaks(
+    timstof_data,  # alphatims.bruker.TimsTOF object
+    peaks: np.ndarray,
+    precursor_mz: float,
+    fragment_mzs: np.ndarray,
+    rt: float,
+    im: float,
+    mz_tol: float = 50,
+    rt_tol: float = 30,
+    im_tol: float = 0.05,
+    return_cubes: bool = False
+) -> dict:
+    """Get the XICs of a precursor and all its fragments by masking the peaks extracted with extract_peptide_peaks.
+
+    The tolerances must not exceed the ones used for the extraction. The peaks are assigned to the m/z tolerance window of each fragment with np.searchsorted and binned in one numba pass.
+
+    Parameters
+    ----------
+    timstof_data : alphatims.bruker.TimsTOF
+        An alphatims.bruker.TimsTOF data object, only its rt_values and mobility_values are used.
+    peaks : np.ndarray
+        The structured array obtained with the extract_peptide_peaks function.
+    precursor_mz : float
+        The precursor m/z value.
+    fragment_mzs : np.ndarray
+        The m/z values of the fragments.
+    rt : float
+        The retention time (in sec) of the precursor.
+    im : float
+        The ion mobility of the precursor.
+    mz_tol: float
+        The mz tolerance value. Default: 50 ppm.
+    rt_tol: float
+        The rt tolerance value. Default: 30 sec.
+    im_tol: float
+        The im tolerance value. Default: 0.05.
+    return_cubes : bool
+        If True, the RT x IM intensity cubes of the precursor and the fragments are also returned. Default: False.
+
+    Returns
+    -------
+    dict
+        The dictionary contains:
+            - 'rt_values': the retention time values (in sec) of the frames between the first and the last extracted frame,
+            - 'precursor_indices': the raw indices of the precursor (MS1) peaks,
+            - 'fragment_indices': a list with the sorted raw indices of the peaks of each fragment,
+            - 'intensities': the (1 + n_fragments) x n_rt intensity matrix, the first row is the precursor,
+            - 'mobility_values' and 'cubes': the ion mobility values and the (1 + n_fragments) x n_rt x n_im intensity cubes, if return_cubes is True.
+    """
+    import alphaviz.utils
+
+    fragment_mzs = np.asarray(fragment_mzs, dtype=np.float64)
+    mz_factor = 1 + mz_tol / 10**6
+    prec_low_mz, prec_high_mz = precursor_mz / mz_factor, precursor_mz * mz_factor
+    # the slices are half-open as in AlphaTims
+    selected = (peaks['rt'] >= rt - rt_tol) & (peaks['rt'] < rt + rt_tol)
+    selected &= (peaks['im'] >= im - im_tol) & (peaks['im'] < im + im_tol)
+    is_precursor = peaks['fragment'] == -1
+    selected &= np.where(
+        is_precursor,
+        (peaks['mz'] >= prec_low_mz) & (peaks['mz'] < prec_high_mz),
+        (peaks['quad_high'] >= prec_low_mz) & (peaks['quad_low'] <= prec_high_mz)
+    )
+    precursor_peaks = peaks[selected & is_precursor]
+    fragment_peaks = peaks[selected & ~is_precursor]
+    peaks = np.concatenate([precursor_peaks, fragment_peaks])
+
+    if len(peaks) > 0:
+        frame_start = max(0, peaks['frame'].min() - 1)
+        frame_end = min(len(timstof_data.rt_values), peaks['frame'].max() + 2)
+        scan_start, scan_end = peaks['scan'].min(), peaks['scan'].max() + 1
+    else:
+        frame_start = frame_end = scan_start = scan_end = 0
+    n_rt, n_im = frame_end - frame_start, scan_end - scan_start
+    bin_indices = peaks['frame'] - frame_start
+    if return_cubes:
+        bin_indices = bin_indices * n_im + peaks['scan'] - scan_start
+
+    n_precursor = len(precursor_peaks)
+    window_starts = np.concatenate([
+        [0],
+        n_precursor + np.searchsorted(fragment_peaks['mz'], fragment_mzs / mz_factor, 'left')
+    ]).astype(np.int64)
+    window_ends = np.concatenate([
+        [n_precursor],
+        n_precursor + np.searchsorted(fragment_peaks['mz'], fragment_mzs * mz_factor, 'left')
+    ]).astype(np.int64)
+    binned = alphaviz.utils.accumulate_window_intensities(
+        bin_indices.astype(np.int64),
+        peaks['intensity'],
+        window_starts,
+        window_ends,
+        n_rt * n_im if return_cubes else n_rt
+    )
+
+    raw_indices = peaks['raw_index']
+    xics = {
+        'rt_values': timstof_data.rt_values[frame_start: frame_end],
+        'precursor_indices': precursor_peaks['raw_index'],
+        'fragment_indices': [
+            np.sort(raw_indices[start: end]) for start, end in zip(window_starts[1:], window_ends[1:])
+        ],
+    }
+    if return_cubes:
+        cubes = binned.reshape(len(window_starts), n_rt, n_im)
+        xics['intensities'] = cubes.sum(axis=2)
+        xics['mobility_values'] = timstof_data.mobility_values[scan_start: scan_end]
+        xics['cubes'] = cubes
+    else:
+        xics['intensities'] = binned
+    return xics
+
+
+def get_fragment_xics(
+    timstof_data,  # alphatims.bruker.TimsTOF object
+    precursor_mz: float,
+    fragment_mzs: np.ndarray,
+    rt: float,
+    im: float,
+    mz_tol: float = 50,
+    rt_tol: float = 30,
+    im_tol: float = 0.05,
+    return_cubes: bool = False
+) -> dict:
+    """Extract the XICs of a precursor and all its fragments with a single slice of the raw data for all fragments.
+
+    The peaks in the RT/IM/quadrupole window of the precursor are sliced once (extract_peptide_peaks), sorted by m/z and assigned to the m/z tolerance window of each fragment with np.searchsorted (get_xics_from_peaks).
+
+    Parameters
+    ----------
+    timstof_data : alphatims.bruker.TimsTOF
+        An alphatims.bruker.TimsTOF data object.
+    precursor_mz : float
+        The precursor m/z value.
+    fragment_mzs : np.ndarray
+        The m/z values of the fragments.
+    rt : float
+        The retention time (in sec) of the precursor.
+    im : float
+        The ion mobility of the precursor.
+    mz_tol: float
+        The mz tolerance value. Default: 50 ppm.
+    rt_tol: float
+        The rt tolerance value. Default: 30 sec.
+    im_tol: float
+        The im tolerance value. Default: 0.05.
+    return_cubes : bool
+        If True, the RT x IM intensity cubes of the precursor and the fragments are also returned. Default: False.
+
+    Returns
+    -------
+    dict
+        See get_xics_from_peaks.
+    """
+    peaks = extract_peptide_peaks(
+        timstof_data, precursor_mz, fragment_mzs, rt, im, mz_tol=mz_tol, rt_tol=rt_tol, im_tol=im_tol
+    )
+    return get_xics_from_peaks(
+        timstof_data, peaks, precursor_mz, fragment_mzs, rt, im,
+        mz_tol=mz_tol, rt_tol=rt_tol, im_tol=im_tol, return_cubes=return_cubes
+    )
+
+
+def get_line_profile(
+    timstof_data,  # alphatims.bruker.TimsTOF object
+    selected_indices: np.ndarray,
+    dimension: str,
+    remove_zeros: bool = False,
+    trim: bool = True,
+    sparse: bool = False
+) -> tuple:
+    """Sum the intensities of the selected raw indices along the m/z, ion mobility or retention time axis, allocating only the occupied range of the axis.
+
+    Parameters
+    ----------
+    timstof_data : alphatims.bruker.TimsTOF
+        An alphatims.bruker.TimsTOF data object.
+    selected_indices : np.ndarray
+        The raw indices that are selected for this profile.
+    dimension : str
+        The axis, one of 'mz_values', 'mobility_values' or 'rt_values'.
+    remove_zeros : bool
+        If True, the empty bins are removed. Default: False.
+    trim : bool
+        If True, the empty bins on the left and right are trimmed, keeping one bin on each side. If False (and remove_zeros and sparse are False), the profile covers the whole axis. Default: True.
+    sparse : bool
+        If True, each run of empty bins is collapsed to its first and last bin, so that the line drawn through the points stays the same. Default: False.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The axis values (the retention time is in sec) and the summed intensities. Both are empty if no index is selected.
+    """
+    selected_indices = np.asarray(selected_indices, dtype=np.int64)
+    if dimension == 'mz_values':
+        axis_values = timstof_data.mz_values
+        bin_indices = timstof_data.tof_indices[selected_indices]
+    else:
+        push_indices = np.searchsorted(timstof_data.push_indptr, selected_indices, 'right') - 1
+        if dimension == 'mobility_values':
+            axis_values = timstof_data.mobility_values
+            bin_indices = push_indices % timstof_data.scan_max_index
+        elif dimension == 'rt_values':
+            axis_values = timstof_data.rt_values
+            bin_indices = push_indices // timstof_data.scan_max_index
+        else:
+            raise ValueError(f"The dimension {dimension} is not supported.")
+    if len(selected_indices) == 0:
+        return np.empty(0, dtype=axis_values.dtype), np.empty(0, dtype=np.float64)
+    if trim or remove_zeros or sparse:
+        start = max(0, bin_indices.min() - 1)
+        end = min(len(axis_values), bin_indices.max() + 2)
+    else:
+        start, end = 0, len(axis_values)
+    intensities = np.bincount(
+        bin_indices - start,
+        weights=timstof_data.intensity_values[selected_indices],
+        minlength=end - start
+    )
+    axis_values = axis_values[start: end]
+    if remove_zeros:
+        keep = intensities > 0
+    elif sparse:
+        is_signal = intensities > 0
+        keep = is_signal.copy()
+        keep[1:] |= is_signal[:-1]
+        keep[:-1] |= is_signal[1:]
+    else:
+        return axis_values, intensities
+    return axis_values[keep], intensities[keep]
+
+
+def get_chromatograms(
+    raw_data  # alphatims.bruker.TimsTOF object
+) -> dict:
+    """Get the per-frame total ion chromatograms (TIC), base peak chromatograms (BPC) and summary metrics of the MS1 and MS2 frames.
+
+    Parameters
+    ----------
+    raw_data : alphatims.bruker.TimsTOF object
+        An Alphatims.bruker.TimsTOF object.
+
+    Returns
+    -------
+    dict
+        The numpy arrays 'ms1_rt', 'ms1_tic', 'ms1_bpc', 'ms2_rt', 'ms2_tic' and 'ms2_bpc' (the retention time is in min) and the summary metrics 'n_ms1_frames', 'n_ms2_frames', 'rt_start' and 'rt_end' (in min).
+    """
+    frames = raw_data.frames
+    chromatograms = dict()
+    for ms_level, is_selected in [('ms1', frames.MsMsType.values == 0), ('ms2', frames.MsMsType.values != 0)]:
+        chromatograms[f'{ms_level}_rt'] = frames.Time.values[is_selected] / 60
+        chromatograms[f'{ms_level}_tic'] = frames.SummedIntensities.values[is_selected]
+        chromatograms[f'{ms_level}_bpc'] = frames.MaxIntensity.values[is_selected]
+        chromatograms[f'n_{ms_level}_frames'] = int(is_selected.sum())
+    rt_values = frames.Time.values / 60
+    chromatograms['rt_start'] = float(rt_values.min()) if len(rt_values) else 0.
+    chromatograms['rt_end'] = float(rt_values.max()) if len(rt_values) else 0.
+    return chromatograms
+
+
+def downsample_min_max(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int
+) -> tuple:
+    """Downsample a line to at most max_points points keeping the minimum and the maximum of each of the max_points / 2 consecutive chunks, so that the peaks are preserved.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The x values sorted in ascending order.
+    y : np.ndarray
+        The y values.
+    max_points : int
+        The maximal number of returned points.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The downsampled x and y values. The input is returned if it has no more than max_points points.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n_points = len(x)
+    if n_points <= max_points:
+        return x, y
+    n_chunks = max(max_points // 2, 1)
+    chunk_bounds = np.linspace(0, n_points, n_chunks + 1).astype(np.int64)
+    chunk_ids = np.repeat(np.arange(n_chunks), np.diff(chunk_bounds))
+    order = np.lexsort((y, chunk_ids))
+    keep = np.unique(np.concatenate([order[chunk_bounds[:-1]], order[chunk_bounds[1:] - 1]]))
+    return x[keep], y[keep]
+
+
+def _get_bins(
+    values: np.ndarray,
+    value_range: tuple,
+    n_bins: int
+) -> tuple:
+    # the bin of each value, -1 outside of the range; there are not more bins than values in the range (but at least two to define an image)
+    in_range = (values >= value_range[0]) & (values <= value_range[1])
+    n_bins = int(max(2, min(n_bins, np.count_nonzero(in_range))))
+    edges = np.linspace(value_range[0], value_range[1], n_bins + 1)
+    bins = np.clip(np.searchsorted(edges, values, 'right') - 1, 0, n_bins - 1)
+    return np.where(in_range, bins, -1).astype(np.int64), edges
+
+
+def get_frame_heatmap(
+    timstof_data,  # alphatims.bruker.TimsTOF object
+    frames,
+    mz_range: tuple = None,
+    im_range: tuple = None,
+    mz_bins: int = 1000,
+    im_bins: int = 500
+) -> dict:
+    """Aggregate the intensities of one or several overlapped frames into a 2D (ion mobility x m/z) histogram straight from the raw arrays, without creating a DataFrame. The frames are added one by one to the same histogram, so the memory use does not depend on the number of frames. The histogram spans only the given m/z and ion mobility ranges, e.g. the zoomed range of the plot, so that zooming in does not lose the resolution.
+
+    Parameters
+    ----------
+    timstof_data : alphatims.bruker.TimsTOF
+        An alphatims.bruker.TimsTOF data object.
+    frames : int or list of int
+        The frame index or the indices of the frames to overlap.
+    mz_range : tuple
+        The (low, high) m/z range of the histogram. Default: None (the whole m/z range of the data).
+    im_range : tuple
+        The (low, high) ion mobility range of the histogram. Default: None (the whole ion mobility range of the data).
+    mz_bins : int
+        The maximal number of bins along the m/z axis. Default: 1000.
+    im_bins : int
+        The maximal number of bins along the ion mobility axis. Default: 500.
+
+    Returns
+    -------
+    dict
+        The dictionary contains:
+            - 'mz_values': the m/z values of the bin centers,
+            - 'mobility_values': the ion mobility values of the bin centers in ascending order,
+            - 'intensities': the (ion mobility bins x m/z bins) summed intensities.
+    """
+    import alphaviz.utils
+
+    data_mz_range = (timstof_data.mz_values[0], timstof_data.mz_values[-1])
+    data_im_range = (timstof_data.mobility_values.min(), timstof_data.mobility_values.max())
+    if mz_range is None:
+        mz_range = data_mz_range
+    if im_range is None:
+        im_range = data_im_range
+    # a range beyond the data is limited to the data
+    mz_range = (max(mz_range[0], data_mz_range[0]), min(mz_range[1], data_mz_range[1]))
+    im_range = (max(im_range[0], data_im_range[0]), min(im_range[1], data_im_range[1]))
+    tof_bins, mz_edges = _get_bins(timstof_data.mz_values, mz_range, mz_bins)
+    scan_bins, im_edges = _get_bins(timstof_data.mobility_values, im_range, im_bins)
+    raster = np.zeros((len(im_edges) - 1, len(mz_edges) - 1), dtype=np.float64)
+    alphaviz.utils.accumulate_frames_histogram(
+        raster,
+        np.atleast_1d(np.asarray(frames, dtype=np.int64)),
+        timstof_data.push_indptr,
+        timstof_data.scan_max_index,
+        timstof_data.tof_indices,
+        timstof_data.intensity_values,
+        tof_bins,
+        scan_bins
+    )
+    return {
+        'mz_values': (mz_edges[1:] + mz_edges[:-1]) / 2,
+        'mobility_values': (im_edges[1:] + im_edges[:-1]) / 2,
+        'intensities': raster,
+    }
+
+
+def get_density_2d(
+    x: np.ndarray,
+    y: np.ndarray,
+    bins: int = 50
+) -> tuple:
+    """Count the points in a 2D grid of equal bins spanning the range of the finite values.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The x values.
+    y : np.ndarray
+        The y values.
+    bins : int
+        The number of bins along each axis. Default: 50.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The x and y values of the bin centers and the (bins of y x bins of x) counts.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    is_finite = np.isfinite(x) & np.isfinite(y)
+    counts, x_edges, y_edges = np.histogram2d(x[is_finite], y[is_finite], bins=bins)
+    return (x_edges[1:] + x_edges[:-1]) / 2, (y_edges[1:] + y_edges[:-1]) / 2, counts.T
+
+
+def get_qc_statistics(
+    df: pd.DataFrame,
+    columns: list,
+    bins: int = 50,
+    count_columns: list = ()
+) -> dict:
+    """Precompute the histograms and the box plot statistics of the columns of a table for the QC distribution plots, vectorized over all columns.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The data frame containing the data.
+    columns : list
+        The names of the columns. The values that are not numeric are ignored.
+    bins : int
+        The number of bins of each histogram. Default: 50.
+    count_columns : list
+        The names of the columns of the discrete values which are also counted. Default: empty tuple.
+
+    Returns
+    -------
+    dict
+        For each column, a dictionary containing:
+            - 'counts' and 'bin_edges': the histogram of the values,
+            - 'n', 'mean', 'q1', 'median', 'q3', 'lowerfence' and 'upperfence': the statistics of a box plot with the whiskers at 1.5 IQR,
+            - 'values' and 'value_counts': the unique values and their counts, for the count columns.
+    """
+    columns = list(columns)
+    values = df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    is_finite = np.isfinite(values)
+    n_values = is_finite.sum(axis=0)
+    lows = np.where(is_finite, values, np.inf).min(axis=0)
+    highs = np.where(is_finite, values, -np.inf).max(axis=0)
+    # the same edges as np.histogram for the columns with a single or without any value
+    lows, highs = np.where(n_values > 0, lows, 0.), np.where(n_values > 0, highs, 1.)
+    is_constant = lows == highs
+    lows, highs = np.where(is_constant, lows - 0.5, lows), np.where(is_constant, highs + 0.5, highs)
+    bin_indices = np.clip(((np.where(is_finite, values, lows) - lows) / (highs - lows) * bins).astype(np.int64), 0, bins - 1)
+    counts = np.bincount(
+        (bin_indices + np.arange(len(columns)) * bins)[is_finite],
+        minlength=len(columns) * bins
+    ).reshape(len(columns), bins)
+    with warnings.catch_warnings():
+        # the columns without any value get NaN statistics
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q1, median, q3 = np.nanpercentile(np.where(is_finite, values, np.nan), [25, 50, 75], axis=0)
+        means = np.where(is_finite, values, 0.).sum(axis=0) / n_values
+    iqr = q3 - q1
+    lowerfences = np.where(is_finite & (values >= q1 - 1.5 * iqr), values, np.inf).min(axis=0)
+    upperfences = np.where(is_finite & (values <= q3 + 1.5 * iqr), values, -np.inf).max(axis=0)
+    statistics = dict()
+    for i, column in enumerate(columns):
+        statistics[column] = {
+            'counts': counts[i],
+            'bin_edges': np.linspace(lows[i], highs[i], bins + 1),
+            'n': int(n_values[i]),
+            'mean': means[i],
+            'q1': q1[i],
+            'median': median[i],
+            'q3': q3[i],
+            'lowerfence': lowerfences[i],
+            'upperfence': upperfences[i],
+        }
+        if column in count_columns:
+            statistics[column]['values'], statistics[column]['value_counts'] = np.unique(
+                df[column].dropna().values,
+                return_counts=True
+            )
+    return statistics
+
+
 def get_identified_ions(
     values: list,
     sequence: str,
@@ -236,6 +1354,119 @@ def get_identified_ions(
     return ions
 
 
+# bits of the ion coverage matrices
+ION_INTACT = 1
+ION_H2O_LOSS = 2
+ION_NH3_LOSS = 4
+ION_CHARGE_2 = 8
+ION_CHARGE_3_PLUS = 16
+
+
+def get_ion_coverage_matrices(
+    ions_list: list,
+    sequence_lengths: list
+) -> np.ndarray:
+    """For many PSMs at once, convert the ion annotations (e.g. ['b2', 'y3-H2O', 'y4(2+)']) into bitmasks of the identified b- and y-ions per residue.
+
+    The position of the b-ion is the amino acid after which the peptide is breaking, the position of the y-ion is the amino acid before which the peptide is breaking, as in the get_identified_ions function. Each value is a combination of the ION_INTACT, ION_H2O_LOSS, ION_NH3_LOSS, ION_CHARGE_2 and ION_CHARGE_3_PLUS bits.
+
+    Parameters
+    ----------
+    ions_list : list
+        A list of arrays with the ion annotations, one array per PSM. Annotations that are not b- or y-ions (e.g. '-') are ignored.
+    sequence_lengths : list
+        The lengths of the peptide sequences of the PSMs.
+
+    Returns
+    -------
+    np.ndarray
+        A uint8 array of the (n_psms, 2, max_sequence_length) shape with the b-ions in the first and y-ions in the second row.
+
+    """
+    sequence_lengths = np.asarray(sequence_lengths, dtype=np.int64)
+    matrices = np.zeros(
+        (len(sequence_lengths), 2, sequence_lengths.max() if len(sequence_lengths) else 0),
+        dtype=np.uint8
+    )
+    psm_indices = np.repeat(
+        np.arange(len(ions_list)),
+        [len(ions) for ions in ions_list]
+    )
+    if len(psm_indices) == 0:
+        return matrices
+    ions = pd.Series(np.concatenate([np.asarray(ions, dtype=object) for ions in ions_list]), dtype=object)
+    parsed = ions.str.extract(
+        r'^([by])(\d+)(?:\((\d+)\+\))?(-H2O|-NH3)?(?:\((\d+)\+\))?$'
+    )
+    is_ion = parsed[0].notna().values
+    psm_indices = psm_indices[is_ion]
+    parsed = parsed[is_ion]
+
+    is_y_ion = (parsed[0] == 'y').values
+    numbers = parsed[1].astype(np.int64).values
+    lengths = sequence_lengths[psm_indices]
+    positions = np.where(is_y_ion, lengths - numbers, numbers - 1)
+    charges = parsed[2].fillna(parsed[4]).fillna(1).astype(np.int64).values
+    bits = np.where(parsed[3].isna().values, ION_INTACT, 0)
+    bits |= np.where((parsed[3] == '-H2O').values, ION_H2O_LOSS, 0)
+    bits |= np.where((parsed[3] == '-NH3').values, ION_NH3_LOSS, 0)
+    bits |= np.where(charges == 2, ION_CHARGE_2, 0)
+    bits |= np.where(charges >= 3, ION_CHARGE_3_PLUS, 0)
+
+    in_sequence = (numbers >= 1) & (numbers <= lengths)
+    np.bitwise_or.at(
+        matrices,
+        (
+            psm_indices[in_sequence],
+            is_y_ion[in_sequence].astype(np.int64),
+            positions[in_sequence]
+        ),
+        bits[in_sequence].astype(np.uint8)
+    )
+    return matrices
+
+
+def get_ion_coverage_matrix(
+    ions: list,
+    sequence_length: int
+) -> np.ndarray:
+    """Convert the ion annotations of one spectrum into bitmasks of the identified b- and y-ions per residue.
+
+    Parameters
+    ----------
+    ions : list
+        The ion annotations of the spectrum, e.g. ['-', 'b2', 'y3-H2O', 'y4(2+)'].
+    sequence_length : int
+        The length of the peptide sequence.
+
+    Returns
+    -------
+    np.ndarray
+        A uint8 array of the (2, sequence_length) shape with the b-ions in the first and y-ions in the second row. Use ion_coverage > 0 to get the fragment coverage ladder.
+
+    """
+    return get_ion_coverage_matrices([ions], [sequence_length])[0]
+
+
+def aggregate_ion_coverage(
+    matrices: np.ndarray
+) -> tuple:
+    """Aggregate the ion coverage matrices of several PSMs of the same peptide.
+
+    Parameters
+    ----------
+    matrices : np.ndarray
+        A uint8 array of the (n_psms, 2, sequence_length) shape obtained with the get_ion_coverage_matrices function.
+
+    Returns
+    -------
+    a tuple of np.ndarrays
+        The bitwise union of the matrices and the number of PSMs identifying each ion, both of the (2, sequence_length) shape.
+
+    """
+    return np.bitwise_or.reduce(matrices, axis=0), np.count_nonzero(matrices, axis=0)
+
+
 def convert_diann_mq_mod(
     sequence: str
 ) -> str:
@@ -1,4 +1,8 @@
 import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
 import numba
 from numba import types
 from numba.typed import Dict, List
@@ -13,6 +17,12 @@ DOCS_PATH = os.path.join(BASE_PATH, "docs")
 DATA_PATH = os.path.join(BASE_PATH, "data")
 MODELS_PATH = os.path.join(BASE_PATH, "models")
 LATEST_GITHUB_INIT_FILE = "https://github.com/MannLabs/alphaviz/blob/main/alphaviz/__init__.py"
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".alphaviz")
+VERSION_CACHE_FILE = os.path.join(CACHE_PATH, "github_version.json")
+VERSION_CACHE_TTL = 24 * 60 * 60  # in seconds
+NO_VERSION_CHECK_VARIABLE = "ALPHAVIZ_NO_VERSION_CHECK"
+# a protein N-term modification or an amino acid with its modification prefix, e.g. 'a', 'oxM', 'A'
+RESIDUE_PATTERN = re.compile(r"^a(?=[a-z])|[^A-Z]*[A-Z]")
 
 
 def check_analysis_file(file):
@@ -21,41 +31,116 @@ def check_analysis_file(file):
 
 
 # this code was taken from the AlphaTims Python package (https://github.com/MannLabs/alphatims/blob/master/alphatims/utils.py) and modified
-def check_github_version(silent=False) -> str:
+def check_github_version(
+    silent=False,
+    url: str = LATEST_GITHUB_INIT_FILE,
+    timeout: float = 5,
+    cache_file: str = VERSION_CACHE_FILE,
+    ttl: float = VERSION_CACHE_TTL
+) -> str:
     """Checks and logs the current version of AlphaViz.
     Check if the local version equals the AlphaViz GitHub master branch.
     This is only possible with an active internet connection and
     if no credentials are required for GitHub.
+    A found version is cached on disk for ttl seconds, and no request is made
+    if the ALPHAVIZ_NO_VERSION_CHECK environment variable is set.
     Parameters
     ----------
     silent : str
         Use the logger to display the obtained conclusion.
         Default is False.
+    url : str
+        The URL of the __init__.py file on GitHub.
+        Default is LATEST_GITHUB_INIT_FILE.
+    timeout : float
+        The timeout of the request in seconds.
+        Default is 5.
+    cache_file : str
+        The path to the .json file caching the result.
+        Default is VERSION_CACHE_FILE.
+    ttl : float
+        How long (in seconds) the cached result is used.
+        Default is VERSION_CACHE_TTL (one day).
     Returns
     -------
     : str
         The version on the AlphaViz GitHub master branch.
         "" if no version can be found on GitHub
     """
-    import requests
-    from bs4 import BeautifulSoup
+    import json
+    import time
     import alphaviz
 
-    try:
-        main_response = requests.get(LATEST_GITHUB_INIT_FILE)
-        main_soap = BeautifulSoup(main_response.content.decode('utf-8'), 'html.parser')
-        for line in main_soap.find_all('td', class_='blob-code blob-code-inner js-file-line'):
-            if line.text.startswith('__version__'):
-                github_version = line.text.split()[-1].strip()[1:-1]
-                if not silent:
-                    if github_version != alphaviz.__version__:
-                        print(f"You are currently using AlphaViz version {alphaviz.__version__}. However, the latest version of AlphaViz on GitHub is {github_version}. Checkout https://github.com/MannLabs/alphaviz.git for instructions on how to update AlphaViz...")
-                    else:
-                        print("Current AlphaViz version is up-to-date with GitHub.")
-                return github_version
-    except:
-        print("Could not check GitHub for the latest AlphaViz release.")
+    if os.environ.get(NO_VERSION_CHECK_VARIABLE):
         return ""
+    github_version = None
+    try:
+        with open(cache_file) as infile:
+            cache = json.load(infile)
+        if cache['url'] == url and cache['version'] and time.time() - cache['time'] < ttl:
+            github_version = cache['version']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    if github_version is None:
+        try:
+            github_version = _request_github_version(url, timeout)
+        except:
+            print("Could not check GitHub for the latest AlphaViz release.")
+            return ""
+        # a page without a version is not cached not to skip the next checks
+        if github_version:
+            try:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                with open(cache_file, 'w') as outfile:
+                    json.dump({'url': url, 'time': time.time(), 'version': github_version}, outfile)
+            except OSError:
+                pass
+    if github_version and not silent:
+        if github_version != alphaviz.__version__:
+            print(f"You are currently using AlphaViz version {alphaviz.__version__}. However, the latest version of AlphaViz on GitHub is {github_version}. Checkout https://github.com/MannLabs/alphaviz.git for instructions on how to update AlphaViz...")
+        else:
+            print("Current AlphaViz version is up-to-date with GitHub.")
+    return github_version
+
+
+def _request_github_version(
+    url: str,
+    timeout: float
+) -> str:
+    import requests
+    from bs4 import BeautifulSoup
+
+    main_response = requests.get(url, timeout=timeout)
+    main_response.raise_for_status()
+    main_soap = BeautifulSoup(main_response.content.decode('utf-8'), 'html.parser')
+    for line in main_soap.find_all('td', class_='blob-code blob-code-inner js-file-line'):
+        if line.text.startswith('__version__'):
+            return line.text.split()[-1].strip()[1:-1]
+    return ""
+
+
+def check_github_version_async(
+    callback,
+    **kwargs
+) -> threading.Thread:
+    """Run check_github_version in a daemon thread and pass the result to the callback.
+    Parameters
+    ----------
+    callback : callable
+        A function called with the version on the AlphaViz GitHub master branch ("" if unknown).
+    **kwargs
+        Keyword arguments passed to check_github_version.
+    Returns
+    -------
+    : threading.Thread
+        The started thread.
+    """
+    thread = threading.Thread(
+        target=lambda: callback(check_github_version(**kwargs)),
+        daemon=True
+    )
+    thread.start()
+    return thread
 
 
 # This code was taken from the AlphaPept Python package (https://github.com/MannLabs/alphapept/blob/master/nbs/03_fasta.ipynb)
@@ -127,7 +212,7 @@ def get_mass_dict(
     return mass_dict
 
 
-@njit
+@njit(cache=True)
 def parse(
     peptide: str
 ) -> List:
@@ -155,7 +240,7 @@ def parse(
     return parsed
 
 
-@njit
+@njit(cache=True)
 def get_precmass(
     parsed_pep: list,
     mass_dict: numba.typed.Dict
@@ -175,7 +260,7 @@ def get_precmass(
     return tmass
 
 
-@njit
+@njit(cache=True)
 def get_fragmass(
     parsed_pep: list,
     mass_dict: numba.typed.Dict
@@ -241,7 +326,7 @@ def get_frag_dict(
     return frag_dict
 
 
-@njit
+@njit(cache=True)
 def calculate_mass(
     mono_mz: float,
     charge: int
@@ -258,7 +343,7 @@ def calculate_mass(
     return prec_mass
 
 
-@njit
+@njit(cache=True)
 def calculate_mz(
     prec_mass: float,
     charge: int
@@ -274,3 +359,420 @@ def calculate_mz(
     mono_mz = prec_mass / abs(charge) + M_PROTON
 
     return mono_mz
+
+
+def get_mass_table(
+    mass_dict: numba.typed.Dict
+) -> tuple:
+    """
+    Convert the mass dict to integer residue codes and a contiguous array of masses
+    Args:
+        mass_dict (numba.typed.Dict): key is the amino acid or the modified amino acid, and the value is the mass.
+    Returns:
+        Tuple[dict{str:int}, np.ndarray(np.float64)]: the integer code of each key of the mass_dict and the masses indexed by these codes.
+    """
+    residue_codes = {key: code for code, key in enumerate(mass_dict.keys())}
+    mass_table = np.array([mass_dict[key] for key in residue_codes], dtype=np.float64)
+    return residue_codes, mass_table
+
+
+def tokenize(
+    peptides: list,
+    residue_codes: dict
+) -> tuple:
+    """
+    Split the modified peptide sequences into integer coded amino acids and modified amino acids
+    Args:
+        peptides (list of str): the modified peptide sequences in the AlphaPept format (e.g. 'AFLDASoxMR').
+        residue_codes (dict{str:int}): the integer codes obtained with the get_mass_table function.
+    Returns:
+        Tuple[np.ndarray(np.int32), np.ndarray(np.int64)]: the codes of all peptides concatenated and the start of each peptide
+        in them, with the total length appended (len = n_peptides + 1). The tokens are the same as returned by the parse function.
+    Raises:
+        KeyError: If an amino acid or a modified amino acid is not in residue_codes.
+    """
+    codes = []
+    peptide_offsets = np.zeros(len(peptides) + 1, dtype=np.int64)
+    for i, peptide in enumerate(peptides):
+        tokens = RESIDUE_PATTERN.findall(peptide.split("_")[0])
+        codes.extend([residue_codes[token] for token in tokens])
+        peptide_offsets[i + 1] = peptide_offsets[i] + len(tokens)
+    return np.array(codes, dtype=np.int32), peptide_offsets
+
+
+@njit(parallel=True, cache=True)
+def get_precmass_batch(
+    codes: np.ndarray,
+    peptide_offsets: np.ndarray,
+    mass_table: np.ndarray,
+    h2o_mass: float
+) -> np.ndarray:
+    """
+    Calculate the masses of the neutral precursors for many tokenized peptides at once
+    Args:
+        codes (np.ndarray(np.int32)): the integer coded amino acids of all peptides, concatenated.
+        peptide_offsets (np.ndarray(np.int64)): the start of each peptide in codes, with the total length appended.
+        mass_table (np.ndarray(np.float64)): the masses indexed by the codes.
+        h2o_mass (float): the H2O mass.
+    Returns:
+        np.ndarray(np.float64): the peptide neutral masses.
+    """
+    n_peptides = len(peptide_offsets) - 1
+    prec_masses = np.empty(n_peptides, dtype=np.float64)
+    for i in numba.prange(n_peptides):
+        tmass = h2o_mass
+        for j in range(peptide_offsets[i], peptide_offsets[i + 1]):
+            tmass += mass_table[codes[j]]
+        prec_masses[i] = tmass
+    return prec_masses
+
+
+@njit(parallel=True, cache=True)
+def get_fragmass_batch(
+    residue_masses: np.ndarray,
+    peptide_offsets: np.ndarray,
+    max_charge: int,
+    loss_masses: np.ndarray,
+    proton_mass: float,
+    h2o_mass: float
+) -> tuple:
+    """
+    Calculate the m/z values of the fragment ions for many peptides at once
+    Args:
+        residue_masses (np.ndarray(np.float64)): the masses of the amino acids and modified amino acids of all peptides, concatenated.
+        peptide_offsets (np.ndarray(np.int64)): the start of each peptide in residue_masses, with the total length appended (len = n_peptides + 1).
+        max_charge (int): the fragments are calculated for the charges 1..max_charge.
+        loss_masses (np.ndarray(np.float64)): the masses of the neutral losses. The intact fragments are always calculated.
+        proton_mass (float): the proton mass.
+        h2o_mass (float): the H2O mass.
+    Returns:
+        Tuple[np.ndarray(np.float64), np.ndarray(np.int8), np.ndarray(np.int16), np.ndarray(np.int8), np.ndarray(np.int8), np.ndarray(np.int64)]:
+        the fragment m/z values, types (0 for b-ion, 1 for y-ion), numbers (b1, b2..., y1, y2...), charges, losses (0 for the intact fragments,
+        i for the loss_masses[i-1]) and the start of each peptide's fragments with the total number appended.
+        For each peptide the fragments are ordered by loss, then by charge, then b-ions before y-ions, so that the first block is
+        equal to the output of get_fragmass.
+    """
+    n_peptides = len(peptide_offsets) - 1
+    n_blocks = max_charge * (len(loss_masses) + 1)
+    fragment_offsets = np.zeros(n_peptides + 1, dtype=np.int64)
+    for i in range(n_peptides):
+        n_aa = peptide_offsets[i + 1] - peptide_offsets[i]
+        fragment_offsets[i + 1] = fragment_offsets[i] + max(n_aa - 1, 0) * 2 * n_blocks
+    n_fragments = fragment_offsets[-1]
+
+    frag_mz = np.empty(n_fragments, dtype=np.float64)
+    frag_type = np.empty(n_fragments, dtype=np.int8)
+    frag_number = np.empty(n_fragments, dtype=np.int16)
+    frag_charge = np.empty(n_fragments, dtype=np.int8)
+    frag_loss = np.empty(n_fragments, dtype=np.int8)
+
+    for i in numba.prange(n_peptides):
+        start = peptide_offsets[i]
+        n_ions = peptide_offsets[i + 1] - start - 1
+        if n_ions <= 0:
+            continue
+        b_masses = np.empty(n_ions, dtype=np.float64)
+        y_masses = np.empty(n_ions, dtype=np.float64)
+        b_mass = 0.
+        y_mass = h2o_mass
+        for j in range(n_ions):
+            b_mass += residue_masses[start + j]
+            y_mass += residue_masses[start + n_ions - j]
+            b_masses[j] = b_mass
+            y_masses[j] = y_mass
+        idx = fragment_offsets[i]
+        for loss in range(len(loss_masses) + 1):
+            loss_mass = 0. if loss == 0 else loss_masses[loss - 1]
+            for charge in range(1, max_charge + 1):
+                for ion_type in range(2):
+                    masses = b_masses if ion_type == 0 else y_masses
+                    for j in range(n_ions):
+                        frag_mz[idx] = (masses[j] - loss_mass) / charge + proton_mass
+                        frag_type[idx] = ion_type
+                        frag_number[idx] = j + 1
+                        frag_charge[idx] = charge
+                        frag_loss[idx] = loss
+                        idx += 1
+
+    return frag_mz, frag_type, frag_number, frag_charge, frag_loss, fragment_offsets
+
+
+def get_fragment_table(
+    peptides: list,
+    mass_dict: numba.typed.Dict,
+    max_charge: int = 1,
+    losses: tuple = ()
+) -> tuple:
+    """
+    Calculate the fragment ions for a list of modified peptide sequences
+    Args:
+        peptides (list of str): the modified peptide sequences in the AlphaPept format (e.g. 'AFLDASoxMR').
+        mass_dict (numba.typed.Dict): key is the amino acid or the modified amino acid, and the value is the mass.
+        max_charge (int, optional): the fragments are calculated for the charges 1..max_charge. Defaults to 1.
+        losses (tuple of str, optional): the keys of the mass_dict for the neutral losses, e.g. ('H2O', 'NH3'). Defaults to ().
+    Returns:
+        Tuple: the output of the get_fragmass_batch function.
+    """
+    residue_codes, mass_table = get_mass_table(mass_dict)
+    codes, peptide_offsets = tokenize(peptides, residue_codes)
+    return get_fragmass_batch(
+        mass_table[codes],
+        peptide_offsets,
+        max_charge,
+        np.array([mass_dict[loss] for loss in losses], dtype=np.float64),
+        mass_dict["Proton"],
+        mass_dict["H2O"]
+    )
+
+
+@njit(parallel=True, cache=True)
+def accumulate_window_intensities(
+    bin_indices: np.ndarray,
+    intensities: np.ndarray,
+    window_starts: np.ndarray,
+    window_ends: np.ndarray,
+    n_bins: int
+) -> np.ndarray:
+    """
+    Sum the intensities of the peaks falling into each window into bins
+    Args:
+        bin_indices (np.ndarray(np.int64)): the bin of each peak.
+        intensities (np.ndarray(np.float64)): the intensity of each peak.
+        window_starts (np.ndarray(np.int64)): the first peak of each window, e.g. obtained with np.searchsorted on the peaks sorted by m/z.
+        window_ends (np.ndarray(np.int64)): the end (exclusive) of each window.
+        n_bins (int): the number of bins.
+    Returns:
+        np.ndarray(np.float64): the (n_windows x n_bins) summed intensities.
+    """
+    binned = np.zeros((len(window_starts), n_bins), dtype=np.float64)
+    for i in numba.prange(len(window_starts)):
+        for j in range(window_starts[i], window_ends[i]):
+            binned[i, bin_indices[j]] += intensities[j]
+    return binned
+
+
+@njit(cache=True)
+def accumulate_frames_histogram(
+    raster: np.ndarray,
+    frames: np.ndarray,
+    push_indptr: np.ndarray,
+    scan_max_index: int,
+    tof_indices: np.ndarray,
+    intensity_values: np.ndarray,
+    tof_bins: np.ndarray,
+    scan_bins: np.ndarray
+) -> None:
+    """
+    Add the intensities of all peaks of several frames frame by frame to one running 2D (ion mobility x m/z) histogram in place
+    Args:
+        raster (np.ndarray(np.float64)): the (n_im_bins x n_mz_bins) histogram.
+        frames (np.ndarray(np.int64)): the frame indices.
+        push_indptr (np.ndarray(np.int64)): the alphatims push index pointer.
+        scan_max_index (int): the number of scans per frame.
+        tof_indices (np.ndarray(np.uint32)): the tof index of each raw peak.
+        intensity_values (np.ndarray(np.uint16)): the intensity of each raw peak.
+        tof_bins (np.ndarray(np.int64)): the m/z bin of each tof index, -1 outside of the histogram.
+        scan_bins (np.ndarray(np.int64)): the ion mobility bin of each scan, -1 outside of the histogram.
+    """
+    for frame in frames:
+        first_push = frame * scan_max_index
+        for scan in range(scan_max_index):
+            im_bin = scan_bins[scan]
+            if im_bin < 0:
+                continue
+            for raw_index in range(push_indptr[first_push + scan], push_indptr[first_push + scan + 1]):
+                mz_bin = tof_bins[tof_indices[raw_index]]
+                if mz_bin >= 0:
+                    raster[im_bin, mz_bin] += intensity_values[raw_index]
+
+
+def _get_nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_get_nbytes(key) + _get_nbytes(val) for key, val in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_get_nbytes(val) for val in value)
+    if isinstance(value, str):
+        return len(value)
+    return 8
+
+
+class LRUCache(object):
+    """
+    A least recently used cache bounded by the number of items and their approximate memory footprint
+    Args:
+        max_size (int, optional): the maximal number of items. Defaults to 1024.
+        max_nbytes (int, optional): the maximal approximate size of the items in bytes. Defaults to 64 MB.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        max_nbytes: int = 64 * 2**20
+    ):
+        self.max_size = max_size
+        self.max_nbytes = max_nbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value) -> None:
+        nbytes = _get_nbytes(value)
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            if nbytes > self.max_nbytes:
+                return
+            self._items[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while len(self._items) > self.max_size or self.nbytes > self.max_nbytes:
+                self.nbytes -= self._items.popitem(last=False)[1][1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+FRAGMENT_CACHE = LRUCache()
+
+
+_MASS_DICT_KEYS = dict()
+
+
+def _get_mass_dict_key(mass_dict) -> tuple:
+    # the masses identify the mass table, they are read once per live dictionary
+    # (the id of a freed dictionary can be reused, so it is forgotten when the dictionary is freed)
+    mass_dict_id = id(mass_dict)
+    entry = _MASS_DICT_KEYS.get(mass_dict_id)
+    if entry is None or entry[0]() is not mass_dict:
+        entry = (
+            weakref.ref(mass_dict, lambda ref: _MASS_DICT_KEYS.pop(mass_dict_id, None)),
+            tuple(sorted(mass_dict.items()))
+        )
+        _MASS_DICT_KEYS[mass_dict_id] = entry
+    return entry[1]
+
+
+def get_peptide_fragments(
+    sequence: str,
+    mass_dict: numba.typed.Dict,
+    charges: tuple = (1,),
+    losses: tuple = ()
+) -> dict:
+    """
+    Get the tokens, the precursor mass and the fragment ions of a modified peptide sequence, cached in FRAGMENT_CACHE
+    Args:
+        sequence (str): the modified peptide sequence in the AlphaPept format (e.g. 'AFLDASoxMR').
+        mass_dict (numba.typed.Dict): key is the amino acid or the modified amino acid, and the value is the mass.
+        charges (tuple of int, optional): the fragment charges. Defaults to (1,).
+        losses (tuple of str, optional): the keys of the mass_dict for the neutral losses, e.g. ('H2O', 'NH3'). Defaults to ().
+    Returns:
+        dict: the 'tokens' (as returned by the parse function), the 'precmass' (the peptide neutral mass) and
+        the read-only fragment arrays 'mz', 'type', 'number', 'charge' and 'loss' as described in get_fragmass_batch.
+        The singly charged intact b- and y-ions go first in the same order as returned by get_fragmass.
+    """
+    charges = tuple(sorted(set(charges)))
+    losses = tuple(losses)
+    key = (sequence, charges, losses, _get_mass_dict_key(mass_dict))
+    fragments = FRAGMENT_CACHE.get(key)
+    if fragments is None:
+        tokens = tuple(RESIDUE_PATTERN.findall(sequence.split("_")[0]))
+        frag_mz, frag_type, frag_number, frag_charge, frag_loss, _ = get_fragment_table(
+            [sequence],
+            mass_dict,
+            max_charge=charges[-1],
+            losses=losses
+        )
+        selection = np.isin(frag_charge, charges)
+        fragments = {
+            'tokens': tokens,
+            'precmass': mass_dict["H2O"] + sum([mass_dict[token] for token in tokens]),
+            'mz': frag_mz[selection],
+            'type': frag_type[selection],
+            'number': frag_number[selection],
+            'charge': frag_charge[selection],
+            'loss': frag_loss[selection],
+        }
+        for name in ['mz', 'type', 'number', 'charge', 'loss']:
+            fragments[name].setflags(write=False)
+        FRAGMENT_CACHE.put(key, fragments)
+    return fragments
+
+
+def _warm_up_numba(
+    mass_dict: numba.typed.Dict
+) -> None:
+    parsed_pep = parse("aAFLDASoxMR_2")
+    calculate_mz(get_precmass(parsed_pep, mass_dict), 2)
+    calculate_mass(500.0, 2)
+    get_fragmass(parsed_pep, mass_dict)
+    get_fragment_table(["AFLDASoxMR"], mass_dict)
+    residue_codes, mass_table = get_mass_table(mass_dict)
+    codes, peptide_offsets = tokenize(["AFLDASoxMR"], residue_codes)
+    get_precmass_batch(codes, peptide_offsets, mass_table, mass_dict["H2O"])
+    accumulate_window_intensities(
+        np.zeros(1, dtype=np.int64),
+        np.ones(1, dtype=np.float64),
+        np.zeros(1, dtype=np.int64),
+        np.ones(1, dtype=np.int64),
+        1
+    )
+    accumulate_frames_histogram(
+        np.zeros((1, 1), dtype=np.float64),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(2, dtype=np.int64),
+        1,
+        np.zeros(0, dtype=np.uint32),
+        np.zeros(0, dtype=np.uint16),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(1, dtype=np.int64)
+    )
+
+
+def warm_up_numba(
+    mass_dict: numba.typed.Dict,
+    background: bool = True
+) -> threading.Thread:
+    """
+    Compile (or load from the on-disk cache) the numba functions of this module by calling them on a small peptide,
+    so that the first peptide selection in the GUI does not pay the JIT latency.
+    Should be called from the main thread: the numba thread pool is started here, because starting it from
+    another thread can block the interpreter shutdown with some threading layers (e.g. TBB).
+    Args:
+        mass_dict (numba.typed.Dict): key is the amino acid or the modified amino acid, and the value is the mass.
+        background (bool, optional): compile in a daemon thread. Defaults to True.
+    Returns:
+        threading.Thread: the started warm-up thread or None if background is False.
+    """
+    numba.get_num_threads()
+    if not background:
+        _warm_up_numba(mass_dict)
+        return None
+    thread = threading.Thread(
+        target=_warm_up_numba,
+        args=(mass_dict,),
+        daemon=True
+    )
+    thread.start()
+    return thread
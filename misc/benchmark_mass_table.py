@@ -0,0 +1,63 @@
+#!python
+"""
+Compare the numba typed Dict mass lookups (parse + get_precmass/get_fragmass)
+with the integer-coded mass table (tokenize + batch kernels).
+
+Usage: python misc/benchmark_mass_table.py [n_peptides]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+import alphaviz.utils
+
+
+def random_peptides(n_peptides, seed=0):
+    rng = np.random.default_rng(seed)
+    aas = np.array(list('ACDEFGHIKLNPQRSTVWY') + ['oxM'])
+    return [
+        ''.join(rng.choice(aas, rng.integers(7, 30))) for _ in range(n_peptides)
+    ]
+
+
+def timeit(name, func, *args):
+    func(*args)  # compile / warm up
+    start = time.perf_counter()
+    func(*args)
+    print(f"{name:<40}{time.perf_counter() - start:.3f} s")
+
+
+def typed_dict_path(peptides, mass_dict):
+    for peptide in peptides:
+        parsed = alphaviz.utils.parse(peptide)
+        alphaviz.utils.get_precmass(parsed, mass_dict)
+        alphaviz.utils.get_fragmass(parsed, mass_dict)
+
+
+def mass_table_path(peptides, mass_dict):
+    residue_codes, mass_table = alphaviz.utils.get_mass_table(mass_dict)
+    codes, peptide_offsets = alphaviz.utils.tokenize(peptides, residue_codes)
+    alphaviz.utils.get_precmass_batch(codes, peptide_offsets, mass_table, mass_dict["H2O"])
+    alphaviz.utils.get_fragmass_batch(
+        mass_table[codes],
+        peptide_offsets,
+        1,
+        np.empty(0, dtype=np.float64),
+        mass_dict["Proton"],
+        mass_dict["H2O"]
+    )
+
+
+if __name__ == '__main__':
+    n_peptides = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    mass_dict = alphaviz.utils.get_mass_dict(
+        modfile=os.path.join(alphaviz.utils.DATA_PATH, 'modifications.tsv'),
+        aasfile=os.path.join(alphaviz.utils.DATA_PATH, 'amino_acids.tsv'),
+        verbose=False,
+    )
+    peptides = random_peptides(n_peptides)
+    print(f"{n_peptides} peptides")
+    timeit('numba typed Dict (parse + get_*mass)', typed_dict_path, peptides, mass_dict)
+    timeit('integer mass table (tokenize + batch)', mass_table_path, peptides, mass_dict)
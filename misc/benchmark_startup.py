@@ -0,0 +1,51 @@
+#!python
+"""
+Measure the latency of the first peptide selection (parse + precursor m/z + fragment masses)
+in a fresh interpreter:
+    - cold: no on-disk numba cache, every kernel is JIT compiled on first use;
+    - cached: the compiled kernels are loaded from the on-disk cache written by the cold run;
+    - warmed up: the kernels are warmed up in a background thread during a simulated GUI startup.
+
+Usage: python misc/benchmark_startup.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+FIRST_CLICK = """
+import os, sys, time
+import alphaviz.utils
+mass_dict = alphaviz.utils.get_mass_dict(
+    modfile=os.path.join(alphaviz.utils.DATA_PATH, 'modifications.tsv'),
+    aasfile=os.path.join(alphaviz.utils.DATA_PATH, 'amino_acids.tsv'),
+    verbose=False,
+)
+if sys.argv[1] == 'warm_up':
+    warm_up = alphaviz.utils.warm_up_numba(mass_dict)
+    warm_up.join()  # stands for the time the user needs to load the data
+start = time.perf_counter()
+parsed_pep = alphaviz.utils.parse('AFLDASoxMR')
+alphaviz.utils.calculate_mz(alphaviz.utils.get_precmass(parsed_pep, mass_dict), 2)
+alphaviz.utils.get_frag_dict(parsed_pep, mass_dict)
+print(time.perf_counter() - start)
+"""
+
+
+def first_click_latency(cache_dir, mode=''):
+    env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+    output = subprocess.run(
+        [sys.executable, '-c', FIRST_CLICK, mode],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print(f"{'cold (JIT compilation)':<40}{first_click_latency(cache_dir):.3f} s")
+        print(f"{'on-disk numba cache':<40}{first_click_latency(cache_dir):.3f} s")
+        print(f"{'on-disk cache + background warm-up':<40}{first_click_latency(cache_dir, 'warm_up'):.3f} s")
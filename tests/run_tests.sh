@@ -1,6 +1,8 @@
 conda activate alphaviz
-# python -m unittest test_cli
+python -m unittest test_cli
 # python -m unittest test_gui
 python -m pytest test_io.py
 python -m pytest test_preprocessing.py
+python -m pytest test_plotting.py
+python -m pytest test_utils.py
 conda deactivate
@@ -3,9 +3,51 @@
 
 # builtin
 import unittest
+import subprocess
+import sys
 
 # local
 import alphaviz.cli
 
+# the startup path must not pay for the heavy visualization/raw data libraries
+IMPORT_TIME_THRESHOLD = 1.0  # seconds
+LAZY_MODULES = ['alphatims', 'holoviews', 'datashader', 'bokeh', 'peptdeep']
+
+
+def get_import_time(module: str) -> float:
+    """Get the cumulative import time (in seconds) of the module in a fresh interpreter using python -X importtime."""
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in output.stderr.splitlines()[::-1]:
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 10**6
+    raise ValueError(f'The import time of {module} is not found.')
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_cli_import_time(self):
+        self.assertLess(get_import_time('alphaviz.cli'), IMPORT_TIME_THRESHOLD)
+
+    def test_lazy_imports(self):
+        output = subprocess.run(
+            [
+                sys.executable,
+                '-c',
+                'import sys, alphaviz.cli, alphaviz.plotting; '
+                f'print([m for m in {LAZY_MODULES} if m in sys.modules])'
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(output.stdout.strip(), '[]')
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -4,8 +4,38 @@
 # builtin
 import unittest
 
+# external
+import panel as pn
+
 # local
 import alphaviz.gui
+import alphaviz.plotting
+
+
+class TestMainTab(unittest.TestCase):
+
+    def test_update_plots_color(self):
+        regex = r"\[(.*?)\]|\((.*?)\)\)?"
+        main_tab = alphaviz.gui.MainTab.__new__(alphaviz.gui.MainTab)
+        main_tab.colorscale_qualitative = pn.widgets.Select(options=['Plotly', 'Dark24'], value='Plotly')
+        main_tab.colorscale_sequential = pn.widgets.Select(options=['Viridis'], value='Viridis')
+        main_tab.chromatograms_plot = None
+        main_tab.protein_coverage_plot = alphaviz.plotting.plot_sequence_coverage(
+            'MPEPTIDEKAAAK', 'gene', ['_PEPTIDEK_', '_AAAK_'], 'Plotly', 'Viridis', regex, 'X'
+        )
+        one_peptide_coverage_plot = alphaviz.plotting.plot_sequence_coverage(
+            'MPEPTIDEKAAAK', 'gene', ['_AAAK_'], 'Plotly', 'Viridis', regex, 'X'
+        )
+        # a peptide is selected
+        main_tab.layout = pn.Column(*[None] * 6, pn.pane.Plotly(one_peptide_coverage_plot), None, None)
+        main_tab.colorscale_qualitative.value = 'Dark24'
+        main_tab.update_plots_color()
+        expected = alphaviz.plotting._get_colors(2, 'Dark24', 'Viridis')
+        self.assertEqual(list(main_tab.layout[6].object.data[1].marker.color), expected[:1])
+        # the peptide is deselected
+        main_tab.layout[6] = pn.pane.Plotly(main_tab.protein_coverage_plot)
+        self.assertEqual(list(main_tab.layout[6].object.data[1].marker.color), expected)
+
 
 if __name__ == "__main__":
     unittest.main()
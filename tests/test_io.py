@@ -33,3 +33,33 @@ def test_read_file():
 #         "Data not only for the specified raw file were extracted."
 #     assert sum(data['MS/MS scan number'].isna()) == 0, \
 #         "NA values in 'MS/MS scan number' column were not dropped."
+
+
+def test_import_chromatograms(tmp_path):
+    from types import SimpleNamespace
+    import numpy as np
+    import pandas as pd
+
+    raw_path = tmp_path / 'run.hdf'
+    raw_path.write_bytes(b'raw data')
+    raw_data = SimpleNamespace(frames=pd.DataFrame({
+        'Time': [60., 61., 62., 63.],
+        'MsMsType': [0, 8, 8, 0],
+        'SummedIntensities': [100, 10, 20, 200],
+        'MaxIntensity': [50, 5, 10, 80],
+    }))
+    cache_path = str(tmp_path / 'cache')
+
+    chromatograms = alphaviz.io.import_chromatograms(str(raw_path), raw_data, cache_path=cache_path)
+    assert chromatograms['ms1_tic'].tolist() == [100, 200] and chromatograms['n_ms2_frames'] == 2, \
+        "The chromatograms are calculated wrongly."
+
+    sidecar = alphaviz.io.import_chromatograms(str(raw_path), cache_path=cache_path)
+    assert sidecar is not None and sidecar.keys() == chromatograms.keys(), \
+        "The chromatograms are not loaded from the sidecar file."
+    assert np.array_equal(sidecar['ms2_rt'], chromatograms['ms2_rt']) and sidecar['rt_end'] == 63. / 60, \
+        "The chromatograms loaded from the sidecar file are different."
+
+    raw_path.write_bytes(b'another raw data')
+    assert alphaviz.io.import_chromatograms(str(raw_path), cache_path=cache_path) is None, \
+        "The sidecar file of a changed raw file is used."
@@ -0,0 +1,83 @@
+#!python
+"""
+This module provides pytest tests for the functions from plotting.py file
+"""
+
+import numpy as np
+
+import alphaviz.plotting
+import alphaviz.preprocessing as preproc
+import alphaviz.utils
+from test_preprocessing import FakeTimsTOF
+
+
+def test_get_cached_xics(monkeypatch):
+    timstof_data = FakeTimsTOF()
+    peptide_info = {
+        'sequence': 'PEPTIDEK',
+        'charge': 2,
+        'mz': 480.,
+        'rt': 20.,
+        'im': 1.,
+        'fragments': {'b2': 200., 'y3': 350.5, 'y6': 700.},
+    }
+    expected = preproc.get_fragment_xics(
+        timstof_data, peptide_info['mz'], list(peptide_info['fragments'].values()), peptide_info['rt'], peptide_info['im'],
+        mz_tol=1000, rt_tol=6, im_tol=0.2
+    )
+    extracted_envelopes = []
+    extract_peptide_peaks = preproc.extract_peptide_peaks
+
+    def count_extractions(*args, **kwargs):
+        extracted_envelopes.append(kwargs)
+        return extract_peptide_peaks(*args, **kwargs)
+
+    monkeypatch.setattr(preproc, 'extract_peptide_peaks', count_extractions)
+    xic_cache = alphaviz.utils.LRUCache()
+    alphaviz.plotting._get_cached_xics(timstof_data, peptide_info, 2000, 10, 0.3, xic_cache)
+    assert extracted_envelopes == [{'mz_tol': 2000, 'rt_tol': alphaviz.plotting.XIC_ENVELOPE_TOLERANCES['rt_tol'], 'im_tol': 0.3}], \
+        "The peaks are not extracted at the envelope tolerances."
+    xics = alphaviz.plotting._get_cached_xics(timstof_data, peptide_info, 1000, 6, 0.2, xic_cache)
+    assert len(extracted_envelopes) == 1, \
+        "The peaks for narrower tolerances are extracted again instead of taken from the cached envelope."
+    assert np.array_equal(xics['rt_values'], expected['rt_values']) and \
+        np.array_equal(xics['intensities'], expected['intensities']), \
+        "The XICs from the cached envelope differ from the directly extracted XICs."
+    assert np.array_equal(xics['precursor_indices'], expected['precursor_indices']) and all(
+        np.array_equal(indices, expected_indices) for indices, expected_indices in zip(
+            xics['fragment_indices'], expected['fragment_indices']
+        )
+    ), "The raw indices from the cached envelope differ from the directly extracted ones."
+    assert alphaviz.plotting._get_cached_xics(timstof_data, peptide_info, 1000, 6, 0.2, xic_cache) is xics, \
+        "The XICs are not taken from the cache."
+    alphaviz.plotting._get_cached_xics(timstof_data, peptide_info, 3000, 6, 0.2, xic_cache)
+    assert len(extracted_envelopes) == 2 and extracted_envelopes[1]['mz_tol'] == 3000, \
+        "The envelope is not widened for wider tolerances."
+
+
+def test_plot_sequence_coverage():
+    sequence = 'MLAAGHKPEPTIDEKAAAPEPTLDEKGGG'
+    peptides = ['_LAAGHKPEPTIDEK_'] * 3 + ['_PEPTIDEK_', '_PEPTIDEK_']
+    regex = r"\[(.*?)\]|\((.*?)\)\)?"
+    peptide_mapping = preproc.map_peptides_to_proteins(['LAAGHKPEPTIDEK', 'PEPTIDEK'], {'X': sequence})
+    for mapping, n_bars in [(None, 2), (peptide_mapping, 3)]:
+        fig = alphaviz.plotting.plot_sequence_coverage(
+            sequence, 'gene', peptides, 'Plotly', 'Viridis', regex, 'X', mapping
+        )
+        peptides_trace = fig.data[1]
+        assert len(peptides_trace.x) == n_bars, \
+            "The PSMs of the same peptide are not drawn as one bar."
+        assert len(np.unique(peptides_trace.y)) == 2 and fig.layout.height == 200, \
+            "The repeated PSMs add lanes to the plot."
+    assert list(peptides_trace.hovertext) == ['LAAGHKPEPTIDEK', 'PEPTIDEK', 'PEPTIDEK'], \
+        "The peptides of the bars are wrong."
+    modified_fig = alphaviz.plotting.plot_sequence_coverage(
+        sequence, 'gene', ['_PEPTIDEK_', '_PEPTIDEK(ox)_'], 'Plotly', 'Viridis', regex, 'X'
+    )
+    assert list(modified_fig.data[1].hovertext) == ['PEPTIDEK, PEPTIDEK(ox)'], \
+        "The modified forms of a peptide are not shown on its bar."
+    empty_fig = alphaviz.plotting.plot_sequence_coverage(
+        sequence, 'gene', [], 'Plotly', 'Viridis', regex, 'X', peptide_mapping
+    )
+    assert len(empty_fig.data[1].x) == 0, \
+        "A protein without peptides should have no peptide bars."
@@ -4,6 +4,8 @@ This module provides pytest tests for the functions from preprocessing.py file
 """
 
 import pytest
+import numpy as np
+import pandas as pd
 import alphaviz.preprocessing as preproc
 
 
@@ -80,3 +82,391 @@ def test_convert_diann_ap_mod():
     assert 'CAALVATAEENLcCcCEELSSK' == preproc.convert_diann_ap_mod(seq2_several_same_mods)
     seq_no_mod = 'CVNTTLQIK'
     assert "CVNTTLQIK" == preproc.convert_diann_ap_mod(seq_no_mod)
+
+
+def test_map_peptides_to_proteins():
+    proteins = {
+        'P1': 'MKLAAGHKPEPTIDEKLAAG',
+        'P2': 'PEPTLDEKRR',
+    }
+    peptides = ['_LAAG_', 'PEPT(ox)IDEK', 'PEPTIDEK', 'RRR']
+    mapping = preproc.map_peptides_to_proteins(peptides, proteins)
+
+    assert mapping.shape == (6, 4), \
+        "The number of peptide-protein pairs is wrong."
+    assert mapping[mapping.peptide == '_LAAG_'].start.tolist() == [2, 16], \
+        "Not all occurrences of the peptide were found."
+    assert mapping[mapping.peptide == 'PEPTIDEK'].protein_id.tolist() == ['P1', 'P2'], \
+        "The I/L ambiguity was not taken into account."
+    assert 'RRR' not in mapping.peptide.values, \
+        "A peptide absent in the proteins was mapped."
+
+    coverage = preproc.get_sequence_coverage(mapping, 'P2', len(proteins['P2']))
+    assert coverage.tolist() == [True] * 8 + [False] * 2, \
+        "The sequence coverage of the protein is wrong."
+
+
+def test_get_protein_groups_coverage():
+    proteins = {
+        'P1': 'MKLAAGHKPEPTIDEKLAAG',
+        'P2': 'PEPTLDEKRR',
+    }
+    mapping = preproc.map_peptides_to_proteins(['LAAG', 'PEPTIDEK'], proteins)
+    protein_groups = pd.Series(['P1;P1-2', 'sp|P2|TEST_HUMAN', 'P3'])
+    coverage, bitmaps = preproc.get_protein_groups_coverage(protein_groups, mapping, proteins)
+
+    assert coverage['Seq coverage, %'].tolist()[:2] == [80.0, 80.0], \
+        "The sequence coverage of the protein groups is wrong."
+    assert coverage['# unique peptides'].tolist() == [2, 1, 0], \
+        "The number of unique peptides is wrong."
+    assert pd.isna(coverage['Seq coverage, %'][2]), \
+        "A protein absent in the fasta file got a coverage value."
+    assert np.unpackbits(bitmaps['P2'])[:10].tolist() == [1] * 8 + [0] * 2, \
+        "The bitmap of the covered residues is wrong."
+
+    proteins = {'A': 'PEPTIDEK', 'B': ''}
+    mapping = preproc.map_peptides_to_proteins(['PEPTIDEK'], proteins)
+    coverage, bitmaps = preproc.get_protein_groups_coverage(pd.Series(['A', 'B']), mapping, proteins)
+    assert coverage['Seq coverage, %'].tolist() == [100.0, 0.0], \
+        "The sequence coverage is wrong if the last protein has an empty sequence."
+
+
+def test_get_ion_coverage_matrices():
+    peptide = 'NTINHN'
+    all_ions = ['', 'b2-H2O', '', '', 'b2', 'b3', '', 'b5-NH3', '', '', '', '', 'y1-NH3', 'y1', 'y4-H2O', 'y4(2+)']
+    coverage = preproc.get_ion_coverage_matrix(all_ions, len(peptide))
+    assert (coverage[0] > 0).tolist() == preproc.get_identified_ions(all_ions, peptide, 'b'), \
+        "The b-ion coverage doesn't match the identified b-ions."
+    assert (coverage[1] > 0).tolist() == [False, False, True, False, False, True], \
+        "The y-ion coverage doesn't match the identified y-ions."
+    assert coverage[0, 1] == preproc.ION_INTACT | preproc.ION_H2O_LOSS, \
+        "The neutral loss variants of the b-ion are not combined."
+    assert coverage[1, 2] == preproc.ION_H2O_LOSS | preproc.ION_INTACT | preproc.ION_CHARGE_2, \
+        "The charge variants of the y-ion are not combined."
+
+    matrices = preproc.get_ion_coverage_matrices([all_ions, ['b1', 'y1', '-']], [6, 4])
+    union, counts = preproc.aggregate_ion_coverage(matrices)
+    assert matrices.shape == (2, 2, 6) and matrices[1, 1, 3] == preproc.ION_INTACT, \
+        "The ion coverage of several PSMs is wrong."
+    assert counts[0].tolist() == [1, 1, 1, 0, 1, 0], \
+        "The number of PSMs per ion is wrong."
+
+
+def test_get_frame_topology():
+    from types import SimpleNamespace
+    raw_data = SimpleNamespace(
+        frames=pd.DataFrame({
+            'Id': [1, 2, 3, 4, 5, 6],
+            'MsMsType': [0, 8, 8, 0, 8, 8],
+        }),
+        fragment_frames=pd.DataFrame(
+            {
+                'Frame': [2, 3, 5, 6],
+                'Precursor': [1, 2, 3, 3],
+            },
+            index=[1, 2, 3, 4]
+        ),
+        precursors=pd.DataFrame({
+            'Id': [1, 2, 3],
+            'Parent': [1, 1, 4],
+            'MonoisotopicMz': [500.1, 600.2, 700.3],
+        }),
+    )
+    topology = preproc.get_frame_topology(raw_data)
+    assert preproc.get_fragment_frame(topology, 3) == 5, \
+        "The fragment frame lookup is wrong."
+    assert [preproc.get_previous_ms1_frame(topology, frame) for frame in [3, 4, 6]] == [1, 1, 4], \
+        "The previous MS1 frame lookup is wrong."
+    for lookup, value in [
+        (preproc.get_fragment_frame, 10),
+        (preproc.get_fragment_frame, -1),
+        (preproc.get_previous_ms1_frame, 1),
+        (preproc.get_previous_ms1_frame, 100),
+    ]:
+        with pytest.raises(ValueError):
+            lookup(topology, value)
+
+    pasef_frames = preproc.get_pasef_frames(topology, [4, 2, 10])
+    assert pasef_frames.Frame.tolist() == [3, 6] and pasef_frames.Parent.tolist() == [1, 4], \
+        "The PASEF frames lookup is wrong."
+    assert pasef_frames.MonoisotopicMz.tolist() == [600.2, 700.3], \
+        "The precursor m/z lookup is wrong."
+
+    topology_hdf = preproc.get_frame_topology(raw_data, frame_shift=1)
+    assert preproc.get_fragment_frame(topology_hdf, 3) == 4, \
+        "The frame shift for the .hdf files is not applied."
+
+
+def test_get_rt_profile():
+    from types import SimpleNamespace
+    scan_max_index = 3
+    n_frames = 10
+    rng = np.random.default_rng(1)
+    push_indptr = np.concatenate([[0], np.cumsum(rng.integers(0, 4, n_frames * scan_max_index))])
+    timstof_data = SimpleNamespace(
+        rt_values=np.arange(n_frames) * 1.5,
+        push_indptr=push_indptr,
+        scan_max_index=scan_max_index,
+        intensity_values=rng.integers(1, 100, push_indptr[-1]).astype(np.uint16),
+    )
+    frames = np.repeat(np.arange(n_frames * scan_max_index), np.diff(push_indptr)) // scan_max_index
+    selected_indices = np.flatnonzero((frames >= 3) & (frames <= 6) & (frames != 5))
+    expected = np.bincount(
+        frames[selected_indices],
+        weights=timstof_data.intensity_values[selected_indices],
+        minlength=n_frames
+    )
+
+    rt_values, intensities = preproc.get_rt_profile(timstof_data, selected_indices)
+    assert np.array_equal(rt_values, timstof_data.rt_values[2:8]) and np.array_equal(intensities, expected[2:8]), \
+        "The trimmed XIC is wrong."
+    rt_values, intensities = preproc.get_rt_profile(timstof_data, selected_indices, trim=False)
+    assert np.array_equal(rt_values, timstof_data.rt_values) and np.array_equal(intensities, expected), \
+        "The XIC over the whole run is wrong."
+    rt_values, intensities = preproc.get_rt_profile(timstof_data, selected_indices, remove_zeros=True)
+    assert np.array_equal(rt_values, timstof_data.rt_values[expected > 0]), \
+        "The zeros are not removed."
+    assert len(preproc.get_rt_profile(timstof_data, np.empty(0, dtype=np.int64))[0]) == 0, \
+        "The XIC for no indices is not empty."
+
+
+class FakeTimsTOF(object):
+    """A minimal stand-in for alphatims.bruker.TimsTOF supporting the [rt, im, precursor, mz, 'raw'] slicing."""
+
+    def __init__(self, seed=0, n_frames=20, scan_max_index=10, n_peaks=5000):
+        rng = np.random.default_rng(seed)
+        self.scan_max_index = scan_max_index
+        self.rt_values = np.arange(n_frames) * 2.
+        self.mobility_values = np.linspace(1.5, 0.5, scan_max_index)
+        self.mz_values = np.linspace(100, 1000, 90001)
+        pushes = np.sort(rng.integers(scan_max_index, n_frames * scan_max_index, n_peaks))
+        self.push_indptr = np.searchsorted(pushes, np.arange(n_frames * scan_max_index + 1))
+        self.tof_indices = rng.integers(0, len(self.mz_values), n_peaks)
+        self.intensity_values = rng.integers(1, 1000, n_peaks).astype(np.uint16)
+        self._frames = pushes // scan_max_index
+        self._scans = pushes % scan_max_index
+        push_frames = np.arange(n_frames * scan_max_index) // scan_max_index
+        push_scans = np.arange(n_frames * scan_max_index) % scan_max_index
+        quad_low = np.where(push_frames % 2 == 1, -1., 400 + 50 * (push_scans % 4))
+        self.quad_indptr = np.arange(n_frames * scan_max_index + 1)
+        self.quad_mz_values = np.stack([quad_low, np.where(quad_low == -1, -1., quad_low + 50)], axis=1)
+        self._is_ms1 = self._frames % 2 == 1
+        self._quad_low = self.quad_mz_values[pushes, 0]
+        self._quad_high = self.quad_mz_values[pushes, 1]
+
+    def __getitem__(self, keys):
+        rt_slice, im_slice, precursor, mz_slice, _ = keys
+        rt = self.rt_values[self._frames]
+        im = self.mobility_values[self._scans]
+        mz = self.mz_values[self.tof_indices]
+        selected = (rt >= rt_slice.start) & (rt < rt_slice.stop)
+        selected &= (im >= im_slice.start) & (im < im_slice.stop)
+        selected &= (mz >= mz_slice.start) & (mz < mz_slice.stop)
+        if isinstance(precursor, slice):
+            selected &= ~self._is_ms1 & (self._quad_low <= precursor.stop) & (self._quad_high >= precursor.start)
+        else:
+            selected &= self._is_ms1
+        return np.flatnonzero(selected)
+
+
+def test_get_fragment_xics():
+    timstof_data = FakeTimsTOF()
+    precursor_mz, rt, im = 480., 20., 1.
+    fragment_mzs = np.array([200., 350.5, 350.6, 700.])
+    mz_tol, rt_tol, im_tol = 2000, 10, 0.3
+    xics = preproc.get_fragment_xics(
+        timstof_data, precursor_mz, fragment_mzs, rt, im,
+        mz_tol=mz_tol, rt_tol=rt_tol, im_tol=im_tol, return_cubes=True
+    )
+    factor = 1 + mz_tol / 10**6
+    rt_slice, im_slice = slice(rt - rt_tol, rt + rt_tol), slice(im - im_tol, im + im_tol)
+    prec_slice = slice(precursor_mz / factor, precursor_mz * factor)
+    expected_indices = [timstof_data[rt_slice, im_slice, 0, prec_slice, 'raw']] + [
+        timstof_data[rt_slice, im_slice, prec_slice, slice(mz / factor, mz * factor), 'raw'] for mz in fragment_mzs
+    ]
+    assert np.array_equal(xics['precursor_indices'], expected_indices[0]), \
+        "The precursor indices are wrong."
+    for i, indices in enumerate(expected_indices):
+        if i > 0:
+            assert np.array_equal(xics['fragment_indices'][i - 1], indices), \
+                "The fragment indices are wrong."
+        rt_values, intensities = preproc.get_rt_profile(timstof_data, indices, remove_zeros=True)
+        row = xics['intensities'][i]
+        assert np.array_equal(xics['rt_values'][row > 0], rt_values) and np.array_equal(row[row > 0], intensities), \
+            "The XIC differs from the one extracted separately."
+    assert np.allclose(xics['cubes'].sum(axis=2), xics['intensities']), \
+        "The RT x IM cubes are inconsistent with the XICs."
+    assert xics['cubes'].shape[2] == len(xics['mobility_values']), \
+        "The ion mobility axis of the cubes is wrong."
+
+
+def test_get_xics_from_peaks():
+    timstof_data = FakeTimsTOF(seed=2)
+    precursor_mz, rt, im = 480., 20., 1.
+    fragment_mzs = np.array([200., 350.5, 350.6, 700.])
+    peaks = preproc.extract_peptide_peaks(
+        timstof_data, precursor_mz, fragment_mzs, rt, im, mz_tol=5000, rt_tol=20, im_tol=0.5
+    )
+    assert (peaks['fragment'][peaks['quad_low'] == -1] == -1).all() and (np.diff(peaks['mz'][peaks['fragment'] >= 0]) >= 0).all(), \
+        "The extracted peaks are not ordered as expected."
+    for tolerances in [dict(mz_tol=5000, rt_tol=20, im_tol=0.5), dict(mz_tol=1000, rt_tol=8, im_tol=0.2)]:
+        refined = preproc.get_xics_from_peaks(timstof_data, peaks, precursor_mz, fragment_mzs, rt, im, **tolerances)
+        extracted = preproc.get_fragment_xics(timstof_data, precursor_mz, fragment_mzs, rt, im, **tolerances)
+        assert np.array_equal(refined['rt_values'], extracted['rt_values']) and np.array_equal(refined['intensities'], extracted['intensities']), \
+            "The XICs refined in memory differ from the extracted ones."
+        assert all(np.array_equal(a, b) for a, b in zip(refined['fragment_indices'], extracted['fragment_indices'])), \
+            "The fragment indices refined in memory differ from the extracted ones."
+
+
+def test_downsample_min_max():
+    x = np.arange(100000, dtype=np.float64)
+    y = np.sin(x / 1000) + (x == 54321) * 10
+    x_down, y_down = preproc.downsample_min_max(x, y, 1000)
+    assert len(x_down) <= 1000 and (np.diff(x_down) > 0).all(), \
+        "The downsampled line is too long or not ordered."
+    assert y_down.max() == y.max() and y_down.min() == y.min() and 54321 in x_down, \
+        "The extremes are not preserved."
+    assert preproc.downsample_min_max(x[:10], y[:10], 1000)[0].tolist() == x[:10].tolist(), \
+        "A short line is changed."
+
+
+def test_get_line_profile():
+    timstof_data = FakeTimsTOF(seed=3, n_peaks=50)
+    selected_indices = np.arange(10, 40)
+    for dimension in ['mz_values', 'mobility_values', 'rt_values']:
+        axis_values, intensities = preproc.get_line_profile(timstof_data, selected_indices, dimension, trim=False)
+        assert len(axis_values) == len(getattr(timstof_data, dimension)), \
+            "The untrimmed profile does not cover the whole axis."
+        trimmed = preproc.get_line_profile(timstof_data, selected_indices, dimension)
+        sparse = preproc.get_line_profile(timstof_data, selected_indices, dimension, sparse=True)
+        assert intensities.sum() == trimmed[1].sum() == sparse[1].sum(), \
+            "The intensities are lost."
+        assert len(sparse[0]) <= len(trimmed[0]) and np.allclose(
+            np.interp(trimmed[0][::-1], sparse[0][::-1], sparse[1][::-1]) if dimension == 'mobility_values'
+            else np.interp(trimmed[0], sparse[0], sparse[1]),
+            trimmed[1][::-1] if dimension == 'mobility_values' else trimmed[1]
+        ), "The sparse profile does not draw the same line."
+    rt_values, rt_intensities = preproc.get_rt_profile(timstof_data, selected_indices)
+    assert np.array_equal(preproc.get_line_profile(timstof_data, selected_indices, 'rt_values')[1], rt_intensities), \
+        "The XIC differs from get_rt_profile."
+
+
+def test_get_frame_heatmap():
+    timstof_data = FakeTimsTOF()
+    frame = 7
+    heatmap = preproc.get_frame_heatmap(timstof_data, frame, mz_bins=50, im_bins=4)
+    assert heatmap['intensities'].shape == (4, 50), \
+        "The shape of the heatmap is wrong."
+    selected = timstof_data._frames == frame
+    mz_edges = np.linspace(100, 1000, 51)
+    im_edges = np.linspace(0.5, 1.5, 5)
+    expected, _, _ = np.histogram2d(
+        timstof_data.mobility_values[timstof_data._scans[selected]],
+        timstof_data.mz_values[timstof_data.tof_indices[selected]],
+        bins=(im_edges, mz_edges),
+        weights=timstof_data.intensity_values[selected]
+    )
+    assert np.allclose(heatmap['intensities'], expected), \
+        "The intensities of the heatmap are wrong."
+    assert np.allclose(heatmap['mz_values'], (mz_edges[1:] + mz_edges[:-1]) / 2), \
+        "The m/z values of the heatmap are wrong."
+    assert np.allclose(heatmap['mobility_values'], (im_edges[1:] + im_edges[:-1]) / 2), \
+        "The mobility values of the heatmap are wrong."
+
+
+def test_get_frame_heatmap_overlapped():
+    timstof_data = FakeTimsTOF()
+    frames = [3, 5, 7]
+    heatmap = preproc.get_frame_heatmap(timstof_data, frames, mz_bins=50, im_bins=4)
+    expected = sum(
+        preproc.get_frame_heatmap(timstof_data, frame, mz_bins=50, im_bins=4)['intensities'] for frame in frames
+    )
+    assert np.allclose(heatmap['intensities'], expected), \
+        "The overlapped frames are not the sum of the single frames."
+    assert heatmap['intensities'].sum() == timstof_data.intensity_values[np.isin(timstof_data._frames, frames)].sum(), \
+        "The overlapped frames miss some intensities."
+
+
+def test_get_frame_heatmap_range():
+    timstof_data = FakeTimsTOF()
+    frame = 7
+    heatmap = preproc.get_frame_heatmap(
+        timstof_data,
+        frame,
+        mz_range=(400, 410),
+        im_range=(0.9, 2.),
+        mz_bins=100,
+        im_bins=500
+    )
+    assert heatmap['intensities'].shape == (6, 100), \
+        "The number of bins is not limited to the values in the range."
+    assert np.isclose(heatmap['mz_values'][0], 400.05) and np.isclose(heatmap['mobility_values'][-1], 1.5 - 0.6 / 12), \
+        "The range of the heatmap is wrong."
+    mz = timstof_data.mz_values[timstof_data.tof_indices]
+    im = timstof_data.mobility_values[timstof_data._scans]
+    selected = (timstof_data._frames == frame) & (mz >= 400) & (mz <= 410) & (im >= 0.9)
+    assert heatmap['intensities'].sum() == timstof_data.intensity_values[selected].sum(), \
+        "The heatmap does not contain exactly the peaks in the range."
+
+
+def test_pack_intervals():
+    starts = np.array([0, 2, 5, 1, 10, 4])
+    ends = np.array([4, 6, 8, 3, 12, 5])
+    lanes = preproc.pack_intervals(starts, ends)
+    assert np.array_equal(lanes, [0, 2, 0, 1, 0, 0]), \
+        "The lanes are wrong."
+    for lane in np.unique(lanes):
+        order = np.argsort(starts[lanes == lane])
+        assert np.all(starts[lanes == lane][order][1:] >= ends[lanes == lane][order][:-1]), \
+            "The intervals of a lane overlap."
+    positions = np.arange(14)
+    assert np.array_equal(
+        preproc.get_interval_coverage(starts, ends, 14),
+        (positions < 8) | ((positions >= 10) & (positions < 12))
+    ), "The coverage is wrong."
+
+
+def test_get_density_2d():
+    x = np.array([0., 1., 1., 2., np.nan])
+    y = np.array([0., 0., 10., 10., 5.])
+    x_centers, y_centers, counts = preproc.get_density_2d(x, y, bins=2)
+    assert np.allclose(x_centers, [0.5, 1.5]) and np.allclose(y_centers, [2.5, 7.5]), \
+        "The bin centers are wrong."
+    assert np.array_equal(counts, [[1, 1], [0, 2]]), \
+        "The counts are wrong."
+
+
+def test_get_qc_statistics():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Mass': rng.normal(1000, 100, 1000),
+        'Charge': rng.integers(1, 5, 1000),
+        'Score': np.nan,
+        'Protein': 'P1',
+    })
+    df.loc[3, 'Mass'] = np.nan
+    df.loc[7, 'Mass'] = 5000
+    statistics = preproc.get_qc_statistics(df, ['Mass', 'Charge', 'Score', 'Protein'], bins=20, count_columns=['Charge'])
+    for column in ['Mass', 'Charge']:
+        values = df[column].dropna().values
+        counts, bin_edges = np.histogram(values, bins=20)
+        assert np.array_equal(statistics[column]['counts'], counts), \
+            f"The histogram of {column} is wrong."
+        assert np.allclose(statistics[column]['bin_edges'], bin_edges), \
+            f"The bin edges of {column} are wrong."
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        assert np.allclose(
+            [statistics[column][stat] for stat in ['q1', 'median', 'q3', 'mean']],
+            [q1, median, q3, values.mean()]
+        ), f"The box plot statistics of {column} are wrong."
+        assert statistics[column]['lowerfence'] == values[values >= q1 - 1.5 * (q3 - q1)].min(), \
+            f"The lower fence of {column} is wrong."
+        assert statistics[column]['upperfence'] == values[values <= q3 + 1.5 * (q3 - q1)].max(), \
+            f"The upper fence of {column} is wrong."
+    assert statistics['Mass']['n'] == 999 and statistics['Mass']['upperfence'] < 5000, \
+        "The outlier is within the whiskers."
+    assert np.array_equal(statistics['Charge']['values'], [1, 2, 3, 4]) and \
+        statistics['Charge']['value_counts'].sum() == 1000, \
+        "The value counts are wrong."
+    assert statistics['Score']['n'] == 0 and statistics['Protein']['counts'].sum() == 0, \
+        "The columns without numeric values are not empty."
@@ -0,0 +1,161 @@
+#!python
+"""
+This module provides pytest tests for the functions from utils.py file
+"""
+import os
+
+import numba
+import numpy as np
+
+import alphaviz.utils
+
+mass_dict = alphaviz.utils.get_mass_dict(
+    modfile=os.path.join(alphaviz.utils.DATA_PATH, 'modifications.tsv'),
+    aasfile=os.path.join(alphaviz.utils.DATA_PATH, 'amino_acids.tsv'),
+    verbose=False,
+)
+
+
+def test_get_fragment_table():
+    peptides = ['AFLDASoxMR', 'aMoxMAK_2', 'K']
+    frag_mz, frag_type, frag_number, frag_charge, frag_loss, fragment_offsets = alphaviz.utils.get_fragment_table(
+        peptides,
+        mass_dict,
+        max_charge=2,
+        losses=('H2O', 'NH3')
+    )
+    assert fragment_offsets.tolist() == [0, 7 * 2 * 6, 7 * 2 * 6 + 3 * 2 * 6, 7 * 2 * 6 + 3 * 2 * 6], \
+        "The number of fragments per peptide is wrong."
+
+    for i, peptide in enumerate(peptides[:2]):
+        frag_masses, frag_types = alphaviz.utils.get_fragmass(alphaviz.utils.parse(peptide), mass_dict)
+        start = fragment_offsets[i]
+        n_frag = len(frag_masses)
+        assert np.allclose(frag_mz[start: start + n_frag], frag_masses), \
+            "The singly charged intact fragments differ from get_fragmass."
+        signed_number = np.where(frag_type[start: start + n_frag] == 0, 1, -1) * frag_number[start: start + n_frag]
+        assert np.array_equal(signed_number, frag_types), \
+            "The fragment types/numbers differ from get_fragmass."
+
+    doubly_charged = (frag_charge == 2) & (frag_loss == 0) & (np.arange(len(frag_mz)) < fragment_offsets[1])
+    proton = mass_dict['Proton']
+    assert np.allclose(
+        (frag_mz[doubly_charged] - proton) * 2 + proton,
+        frag_mz[:fragment_offsets[1]][(frag_charge[:fragment_offsets[1]] == 1) & (frag_loss[:fragment_offsets[1]] == 0)]
+    ), "The doubly charged fragment m/z values are wrong."
+    water_loss = (frag_charge == 1) & (frag_loss == 1) & (np.arange(len(frag_mz)) < fragment_offsets[1])
+    assert np.allclose(frag_mz[:14] - frag_mz[water_loss], mass_dict['H2O']), \
+        "The neutral loss fragment m/z values are wrong."
+
+
+def test_get_precmass_batch():
+    peptides = ['AFLDASoxMR', 'aMoxMAK_2', 'K']
+    residue_codes, mass_table = alphaviz.utils.get_mass_table(mass_dict)
+    codes, peptide_offsets = alphaviz.utils.tokenize(peptides, residue_codes)
+    assert peptide_offsets.tolist() == [0, 8, 12, 13], \
+        "The peptides are tokenized wrongly."
+    prec_masses = alphaviz.utils.get_precmass_batch(codes, peptide_offsets, mass_table, mass_dict['H2O'])
+    assert np.allclose(
+        prec_masses,
+        [alphaviz.utils.get_precmass(alphaviz.utils.parse(peptide), mass_dict) for peptide in peptides]
+    ), "The precursor masses differ from get_precmass."
+
+
+def test_warm_up_numba():
+    thread = alphaviz.utils.warm_up_numba(mass_dict)
+    thread.join()
+    assert alphaviz.utils.get_fragmass.signatures and alphaviz.utils.get_precmass_batch.signatures, \
+        "The numba functions are not compiled by the warm-up."
+
+
+def test_lru_cache():
+    cache = alphaviz.utils.LRUCache(max_size=2, max_nbytes=2000)
+    cache.put('a', np.zeros(100))
+    cache.put('b', np.zeros(100))
+    assert cache.get('a') is not None and cache.hits == 1, \
+        "The cached item is not returned."
+    cache.put('c', np.zeros(100))
+    assert 'b' not in cache and 'a' in cache and len(cache) == 2, \
+        "The least recently used item is not evicted."
+    cache.put('d', np.zeros(200))
+    assert len(cache) == 1 and cache.nbytes == 1600, \
+        "The cache exceeds the memory limit."
+    assert cache.get('b') is None and cache.misses == 1, \
+        "The cache misses are not counted."
+
+
+def test_get_peptide_fragments():
+    alphaviz.utils.FRAGMENT_CACHE.clear()
+    fragments = alphaviz.utils.get_peptide_fragments('AFLDASoxMR', mass_dict, charges=(1, 2), losses=('H2O',))
+    frag_masses, _ = alphaviz.utils.get_fragmass(alphaviz.utils.parse('AFLDASoxMR'), mass_dict)
+    assert np.allclose(fragments['mz'][:len(frag_masses)], frag_masses), \
+        "The fragment masses differ from get_fragmass."
+    assert np.isclose(fragments['precmass'], alphaviz.utils.get_precmass(alphaviz.utils.parse('AFLDASoxMR'), mass_dict)), \
+        "The precursor mass differs from get_precmass."
+    assert fragments['tokens'][-2:] == ('oxM', 'R') and len(fragments['mz']) == 7 * 2 * 2 * 2, \
+        "The peptide is tokenized wrongly."
+    assert alphaviz.utils.get_peptide_fragments('AFLDASoxMR', mass_dict, charges=(2, 1), losses=('H2O',)) is fragments, \
+        "The fragments are not taken from the cache."
+    assert alphaviz.utils.FRAGMENT_CACHE.hits == 1 and alphaviz.utils.FRAGMENT_CACHE.misses == 1, \
+        "The cache hits/misses are counted wrongly."
+    heavy_mass_dict = numba.typed.Dict.empty(key_type=numba.types.unicode_type, value_type=numba.types.float64)
+    for aa, mass in mass_dict.items():
+        heavy_mass_dict[aa] = mass
+    heavy_mass_dict['R'] += 10
+    heavy_fragments = alphaviz.utils.get_peptide_fragments('AFLDASoxMR', heavy_mass_dict, charges=(1, 2), losses=('H2O',))
+    assert np.isclose(heavy_fragments['precmass'], fragments['precmass'] + 10), \
+        "The fragments of another mass table are taken from the cache."
+
+
+def test_check_github_version(tmp_path, monkeypatch):
+    import http.server
+    import threading
+
+    requests_count = []
+    page = {
+        'content': b'<table><tr><td class="blob-code blob-code-inner js-file-line">'
+                   b'__version__ = "9.9.9"</td></tr></table>'
+    }
+
+    class GitHubStandIn(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_count.append(self.path)
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(page['content'])
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(('127.0.0.1', 0), GitHubStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/alphaviz/__init__.py"
+    cache_file = str(tmp_path / 'github_version.json')
+    monkeypatch.delenv(alphaviz.utils.NO_VERSION_CHECK_VARIABLE, raising=False)
+    try:
+        assert alphaviz.utils.check_github_version(silent=True, url=url, cache_file=cache_file) == '9.9.9', \
+            "The version is not extracted from the page."
+        assert alphaviz.utils.check_github_version(silent=True, url=url, cache_file=cache_file) == '9.9.9' and len(requests_count) == 1, \
+            "The cached version is not used."
+        alphaviz.utils.check_github_version(silent=True, url=url, cache_file=cache_file, ttl=0)
+        assert len(requests_count) == 2, \
+            "The expired cached version is used."
+
+        result = []
+        alphaviz.utils.check_github_version_async(result.append, silent=True, url=url, cache_file=cache_file).join()
+        assert result == ['9.9.9'], \
+            "The callback does not receive the version."
+
+        page['content'] = b'<table></table>'
+        empty_cache_file = str(tmp_path / 'empty.json')
+        assert alphaviz.utils.check_github_version(silent=True, url=url, cache_file=empty_cache_file) == '', \
+            "A version is found on a page without a version."
+        alphaviz.utils.check_github_version(silent=True, url=url, cache_file=empty_cache_file)
+        assert len(requests_count) == 4, \
+            "A page without a version is cached."
+
+        monkeypatch.setenv(alphaviz.utils.NO_VERSION_CHECK_VARIABLE, '1')
+        assert alphaviz.utils.check_github_version(silent=True, url=url, cache_file=str(tmp_path / 'other.json')) == '' and len(requests_count) == 4, \
+            "The version is checked despite the offline switch."
+    finally:
+        server.shutdown()